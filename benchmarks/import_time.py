@@ -0,0 +1,45 @@
+"""Startup benchmark: time to import chatanalytics in a fresh interpreter
+
+Run from the base directory with ``python -m benchmarks.import_time``
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+statements = {
+    "import chatanalytics": "import chatanalytics",
+    "import Chat": "from chatanalytics import Chat",
+    "create Chat": "from chatanalytics import Chat; Chat()",
+    "create Chat and analyze": "from chatanalytics import Chat; Chat().analyze",
+    "create Chat and graph": "from chatanalytics import Chat; Chat().graph",
+}
+
+
+def time_statement(statement, repeat=5):
+    """Runs a statement in fresh interpreters
+
+    :param statement: Python source to run
+    :param repeat: number of interpreters to start
+    :return: median seconds taken, excluding interpreter startup
+    """
+    baseline = _time_process("pass", repeat)
+    return max(0.0, _time_process(statement, repeat) - baseline)
+
+
+def _time_process(statement, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run(repeat=5):
+    return {name: time_statement(statement, repeat) for name, statement in statements.items()}
+
+
+if __name__ == "__main__":
+    for name, seconds in run().items():
+        print(f"{name:<28}{seconds * 1000:>10.1f} ms")
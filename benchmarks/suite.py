@@ -0,0 +1,203 @@
+"""Benchmark suite for ingest and query
+
+Generates synthetic exports (see synthetic.py), times loading,
+processing and querying them, and compares the timings against
+stored baselines in baseline.json.
+
+Run from the base directory with ``python -m benchmarks.suite``;
+pass ``--save-baseline`` to record the current timings instead.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import matplotlib
+
+import chatanalytics
+from . import import_time, synthetic
+
+local_root = os.path.dirname(os.path.abspath(__file__))
+baseline_path = os.path.join(local_root, "baseline.json")
+
+queries = [
+    "messages per day",
+    "words per month by sender",
+    "mean of characters per conversation by channel",
+    "median of messages per day by year",
+    "total of words per conversation by sender",
+    "conversations per week",
+    "duration per conversation",
+    "median of response time per message by sender",
+    "turns per conversation",
+]
+graphs = [
+    ("line", "messages per day"),
+    ("bar", "words per year by channel"),
+]
+
+
+def _time(function, repeat):
+    """Median seconds taken by function"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _processed_chat(path, rollup=False):
+    chat = chatanalytics.Chat().set_rollup(rollup)
+    chat.batch_load(path, do_walk=True)
+    chat.messages  # noqa, process
+    return chat
+
+
+def _time_timed(function, repeat):
+    """Median of the seconds returned by function"""
+    return statistics.median(function() for _ in range(repeat))
+
+
+def run_platform(name, path, repeat):
+    timings = {}
+    first_file = next(os.path.join(dirpath, f) for dirpath, _, filenames in sorted(os.walk(path))
+                      for f in sorted(filenames) if f in ("message_1.json", "messages.csv"))
+
+    timings[f"{name}: load"] = _time(lambda: chatanalytics.Chat().load(first_file), repeat)
+    timings[f"{name}: batch_load"] = _time(lambda: chatanalytics.Chat().batch_load(path, do_walk=True), repeat)
+
+    def post_process():
+        chat = chatanalytics.Chat().batch_load(path, do_walk=True)
+        start = time.perf_counter()
+        chat._post_process()
+        return time.perf_counter() - start
+    timings[f"{name}: _post_process"] = _time_timed(post_process, repeat)
+
+    # Stable sort of the loaded runs, against sort_values
+    loaded = chatanalytics.Chat().batch_load(path, do_walk=True)
+
+    def sort_order():
+        start = time.perf_counter()
+        loaded._messages.take(loaded._sort_order(loaded._messages)).reset_index(drop=True)
+        return time.perf_counter() - start
+    timings[f"{name}: sort by _sort_order"] = _time_timed(sort_order, repeat)
+
+    def sort_values():
+        start = time.perf_counter()
+        loaded._messages.sort_values("timestamp", ignore_index=True)
+        return time.perf_counter() - start
+    timings[f"{name}: sort by sort_values"] = _time_timed(sort_values, repeat)
+
+    chat = _processed_chat(path)
+
+    def set_timezone():
+        start = time.perf_counter()
+        chat.set_timezone("Asia/Tokyo" if chat._timezone != "Asia/Tokyo" else "UTC")
+        return time.perf_counter() - start
+    timings[f"{name}: set_timezone"] = _time_timed(set_timezone, repeat)
+
+    chat = _processed_chat(path)
+
+    def chat_hash():
+        chat._hash = None
+        start = time.perf_counter()
+        hash(chat)
+        return time.perf_counter() - start
+    timings[f"{name}: __hash__"] = _time_timed(chat_hash, repeat)
+
+    for query in queries:
+        timings[f"{name}: analyze '{query}'"] = _time(lambda: chat.analyze(query), repeat)
+
+    rollup = _processed_chat(path, rollup=True)
+    for query in queries:
+        timings[f"{name}: analyze '{query}' (rollup)"] = _time(lambda: rollup.analyze(query), repeat)
+
+    matplotlib.use("Agg")
+    with tempfile.TemporaryDirectory() as out_dir:
+        for kind, query in graphs:
+            timings[f"{name}: graph {kind} '{query}'"] = _time(
+                lambda: chat.graph.render_batch([(kind, query)], out_dir), repeat)
+    return timings
+
+
+def run(messages=50000, channels=20, repeat=3, include_imports=True):
+    """Runs every benchmark
+
+    :param messages: number of messages to generate per platform
+    :param channels: number of threads/channels to generate per platform
+    :param repeat: number of runs to take the median of
+    :param include_imports: whether to run the import benchmarks
+    :return: dict of benchmark name -> seconds
+    """
+    timings = {}
+    if include_imports:
+        timings.update({f"import: {name}": seconds for name, seconds in import_time.run(repeat).items()})
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic.generate_messenger(os.path.join(directory, "messenger"), messages, threads=channels)
+        synthetic.generate_discord(os.path.join(directory, "discord"), messages, channels=channels)
+        timings.update(run_platform("messenger", os.path.join(directory, "messenger", "inbox"), repeat))
+        timings.update(run_platform("discord", os.path.join(directory, "discord", "messages"), repeat))
+    return timings
+
+
+def load_baseline(path=baseline_path):
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_baseline(timings, messages, path=baseline_path):
+    with open(path, "w", encoding='utf-8') as file:
+        json.dump({"messages": messages, "timings": timings}, file, indent=2, sort_keys=True)
+
+
+def compare(timings, baseline, tolerance=1.5):
+    """Compares timings against a baseline
+
+    :param timings: dict of benchmark name -> seconds
+    :param baseline: dict of benchmark name -> seconds
+    :param tolerance: ratio to baseline above which a benchmark has regressed
+    :return: list of (name, seconds, baseline seconds or None, regressed)
+    """
+    rows = []
+    for name, seconds in timings.items():
+        previous = baseline.get(name)
+        rows.append((name, seconds, previous, previous is not None and seconds > previous * tolerance))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=None,
+                        help="messages per platform, defaults to the baseline's size")
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--no-imports", action="store_true")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    baseline = load_baseline()
+    messages = args.messages or baseline.get("messages", 50000)
+    timings = run(messages, args.channels, args.repeat, include_imports=not args.no_imports)
+
+    if args.save_baseline:
+        save_baseline(timings, messages)
+        print(f"Saved baseline to {baseline_path}")
+    if baseline.get("messages") != messages:
+        baseline = {}
+
+    regressed = False
+    for name, seconds, previous, slower in compare(timings, baseline.get("timings", {}), args.tolerance):
+        ratio = f"{seconds / previous:>7.2f}x" if previous else " " * 8
+        print(f"{name:<72}{seconds * 1000:>11.1f} ms {ratio}{'  REGRESSED' if slower else ''}")
+        regressed |= slower
+    return 1 if regressed and not args.save_baseline else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
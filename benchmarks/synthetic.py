@@ -0,0 +1,214 @@
+"""Synthetic platform exports for benchmarking
+
+Writes Messenger and Discord export trees in the same layout as the
+real exports (and the fixtures in ``test/test_data``), at any size.
+
+Run from the base directory with, for example,
+``python -m benchmarks.synthetic /tmp/export --messages 1000000``
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+vocabulary = ("the be to of and a in that have it for not on with he as you do at this but his by from they we "
+              "say her she or an will my one all would there their what so up out if about who get which go me "
+              "when make can like time no just him know take people into year your good some could them see "
+              "other than then now look only come its over think also back after use two how our work first "
+              "well way even new want because any these give day most us lol ok yeah haha tonight tomorrow "
+              "meeting dinner game later sure thanks sorry message chat call weekend").split()
+
+
+def _weights(count, skew):
+    """Zipf-like weights, so the first few items take most of the share"""
+    weights = 1 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+
+def _split_counts(rng, total, count, skew):
+    """Splits total messages between count channels"""
+    counts = rng.multinomial(total, _weights(count, skew))
+    return counts[counts > 0]
+
+
+def _timestamps(rng, count, start, end, burst_size, message_gap):
+    """Timestamps in milliseconds, in bursts of messages
+
+    Burst sizes are geometric with mean burst_size, messages within a
+    burst are message_gap seconds apart on average, and bursts are spread
+    over [start, end).
+
+    :return: sorted int64 array of milliseconds since the epoch
+    """
+    sizes = rng.geometric(1 / burst_size, size=count // burst_size + 1)
+    while sizes.sum() < count:
+        sizes = np.concatenate([sizes, rng.geometric(1 / burst_size, size=count // burst_size + 1)])
+    burst_starts = np.cumsum(sizes)
+    burst_starts = np.concatenate([[0], burst_starts[burst_starts < count]])
+
+    offsets = rng.exponential(message_gap * 1000, size=count)
+    offsets[burst_starts] = 0
+    # Time since the start of each burst
+    within = np.cumsum(offsets) - np.repeat(np.cumsum(offsets)[burst_starts], np.diff(np.append(burst_starts, count)))
+
+    starts = np.sort(rng.uniform(start, end, size=len(burst_starts)))
+    times = np.repeat(starts, np.diff(np.append(burst_starts, count))) + within
+    return np.sort(times.astype(np.int64))
+
+
+def _contents(rng, count, words_per_message):
+    """Random message contents drawn from vocabulary"""
+    lengths = rng.poisson(words_per_message - 1, size=count) + 1
+    words = np.array(vocabulary, dtype=object)[rng.integers(0, len(vocabulary), size=lengths.sum())]
+    ends = np.cumsum(lengths)
+    return [" ".join(words[end - length:end]) for end, length in zip(ends, lengths)]
+
+
+def _epoch_ms(timestamp):
+    return pd.Timestamp(timestamp, tz="UTC").value // 10**6
+
+
+def generate_messenger(directory, messages, threads=20, senders=8, channel_skew=1.0, sender_skew=1.0,
+                       burst_size=8, message_gap=60, words_per_message=6, noise=0.02,
+                       messages_per_file=10000, start="2015-01-01", end="2022-01-01", seed=0):
+    """Writes a Messenger export with inbox/<thread>/message_N.json files
+
+    :param directory: the export root, which will contain inbox/
+    :param messages: total number of messages across all threads
+    :param threads: number of threads
+    :param senders: largest number of participants in a thread
+    :param channel_skew: Zipf exponent of the number of messages per thread
+    :param sender_skew: Zipf exponent of the number of messages per sender
+    :param burst_size: mean number of messages in a burst
+    :param message_gap: mean seconds between messages in a burst
+    :param words_per_message: mean number of words in a message
+    :param noise: fraction of unsent or non-text messages
+    :param messages_per_file: messages per message_N.json part
+    :param start: earliest timestamp
+    :param end: latest timestamp
+    :param seed: random seed
+    :return: list of thread folders written
+    """
+    rng = np.random.default_rng(seed)
+    start_ms, end_ms = _epoch_ms(start), _epoch_ms(end)
+    written = []
+    for thread, count in enumerate(_split_counts(rng, messages, threads, channel_skew)):
+        participants = [f"Sender {thread}-{i}" for i in range(rng.integers(2, max(senders, 2) + 1))]
+        title = participants[1] if len(participants) == 2 else f"Group {thread}"
+        folder = f"thread{thread}_{rng.integers(10**7, 10**8)}"
+        path = os.path.join(directory, "inbox", folder)
+        os.makedirs(path, exist_ok=True)
+
+        # Messenger exports are newest first, across and within parts
+        timestamps = _timestamps(rng, count, start_ms, end_ms, burst_size, message_gap)[::-1]
+        names = np.array(participants, dtype=object)[
+            rng.choice(len(participants), size=count, p=_weights(len(participants), sender_skew))]
+        contents = _contents(rng, count, words_per_message)
+        unsent = rng.random(count) < noise / 2
+        shared = rng.random(count) < noise / 2
+
+        for part, first in enumerate(range(0, count, messages_per_file)):
+            rows = []
+            for i in range(first, min(first + messages_per_file, count)):
+                row = {"sender_name": names[i], "timestamp_ms": int(timestamps[i])}
+                if shared[i]:
+                    row["share"] = {"link": "https://example.com"}
+                    row["type"] = "Share"
+                else:
+                    # Messenger writes UTF-8 text as latin-1 escapes
+                    row["content"] = contents[i].encode("utf-8").decode("latin-1")
+                    row["type"] = "Generic"
+                row["is_unsent"] = bool(unsent[i])
+                rows.append(row)
+            data = {
+                "participants": [{"name": name} for name in participants],
+                "messages": rows,
+                "title": title,
+                "is_still_participant": True,
+                "thread_type": "Regular" if len(participants) == 2 else "RegularGroup",
+                "thread_path": f"inbox/{folder}",
+                "magic_words": [],
+            }
+            with open(os.path.join(path, f"message_{part + 1}.json"), "w", encoding='utf-8') as file:
+                json.dump(data, file, indent=2)
+        written.append(path)
+    return written
+
+
+def generate_discord(directory, messages, channels=20, channel_skew=1.0, burst_size=8, message_gap=60,
+                     words_per_message=6, noise=0.02, start="2015-01-01", end="2022-01-01", seed=0):
+    """Writes a Discord export with messages/c<id>/channel.json and messages.csv
+
+    Discord exports only contain the user's own messages, so there is
+    no sender distribution. Channels are a mix of server channels,
+    direct messages and group chats.
+
+    :param directory: the export root, which will contain messages/
+    :param messages: total number of messages across all channels
+    :param channels: number of channels
+    :param channel_skew: Zipf exponent of the number of messages per channel
+    :param burst_size: mean number of messages in a burst
+    :param message_gap: mean seconds between messages in a burst
+    :param words_per_message: mean number of words in a message
+    :param noise: fraction of messages without content
+    :param start: earliest timestamp
+    :param end: latest timestamp
+    :param seed: random seed
+    :return: list of channel folders written
+    """
+    rng = np.random.default_rng(seed)
+    start_ms, end_ms = _epoch_ms(start), _epoch_ms(end)
+    root = os.path.join(directory, "messages")
+    os.makedirs(root, exist_ok=True)
+    index, written = {}, []
+    for number, count in enumerate(_split_counts(rng, messages, channels, channel_skew)):
+        channel_id = str(rng.integers(10**15, 10**16))
+        kind = number % 3
+        if kind == 0:
+            channel = {"id": channel_id, "type": 0, "name": f"channel-{number}",
+                       "guild": {"id": str(rng.integers(10**15, 10**16)), "name": f"Server {number // 3}"}}
+        elif kind == 1:
+            channel = {"id": channel_id, "type": 1, "recipients": [str(rng.integers(10**15, 10**16))]}
+        else:
+            channel = {"id": channel_id, "type": 3,
+                       "recipients": [str(rng.integers(10**15, 10**16)) for _ in range(rng.integers(2, 6))]}
+        index[channel_id] = channel.get("name")
+
+        # Discord exports are newest first
+        timestamps = _timestamps(rng, count, start_ms, end_ms, burst_size, message_gap)[::-1]
+        contents = np.array(_contents(rng, count, words_per_message), dtype=object)
+        contents[rng.random(count) < noise] = ""
+        frame = pd.DataFrame({
+            "ID": rng.integers(10**15, 10**16, size=count),
+            "Timestamp": pd.to_datetime(timestamps, unit="ms", utc=True).strftime("%Y-%m-%d %H:%M:%S.%f+00:00"),
+            "Contents": contents,
+            "Attachments": "",
+        })
+
+        path = os.path.join(root, f"c{channel_id}")
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "channel.json"), "w", encoding='utf-8') as file:
+            json.dump(channel, file, indent=2)
+        frame.to_csv(os.path.join(path, "messages.csv"), index=False)
+        written.append(path)
+
+    with open(os.path.join(root, "index.json"), "w", encoding='utf-8') as file:
+        json.dump(index, file)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--platform", choices=["messenger", "discord"], default="messenger")
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.platform == "messenger":
+        generate_messenger(args.directory, args.messages, threads=args.channels, seed=args.seed)
+    else:
+        generate_discord(args.directory, args.messages, channels=args.channels, seed=args.seed)
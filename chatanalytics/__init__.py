@@ -1 +1,24 @@
-from .chats import Chat
+import importlib
+
+# Submodules and attributes are imported on first access so that
+# `import chatanalytics` does not pay for pandas until it is needed
+_lazy_attributes = {"Chat": ".chats", "StageProfiler": ".profiling"}
+_lazy_submodules = {"autocorrect", "chatanalysis", "chatgraph", "chats", "chatsql", "client", "profiling", "protocol",
+                    "server", "snapshots", "sources", "utils"}
+
+__all__ = ["Chat", "StageProfiler"]
+
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        module = importlib.import_module(_lazy_attributes[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    if name in _lazy_submodules:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes) | _lazy_submodules)
@@ -1,33 +1,99 @@
+import hashlib
+import json
 import os.path
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
 
 token_match = re.compile(r"[\w']+|[, ]+")
+word_match = re.compile(r"[\w']+")
+word_split = re.compile(f"({word_match.pattern})")  # splits content into words and the text between them
 local_root = os.path.dirname(os.path.abspath(__file__))
-alphabet = "abcdefghijklmnopqrstuvwxyz"
-first_letter_lookup = {key: [] for key in alphabet}
+max_distance = 2  # corrections further away than this are ignored
 
-with open(local_root + "/autocorrect.txt", "r") as f:
-    words = f.read().split()
-    for word in words:
-        first_letter_lookup[word[0]] += [word]
+# Message content is corrected against a Vocabulary rather than the query dictionary
+content_min_length = 4  # shorter content words are never corrected
+content_min_count = 3  # content words used this often are taken as spelled correctly
+content_ratio = 5  # how many times more frequent a correction must be than its rivals
+
+# (words in file order, which break ties between candidates, the set of them,
+#  symmetric-delete index: deletion variant -> positions in the words), built on first use
+query_index = None
+query_index_lock = threading.Lock()
+
+
+def _deletes(word, depth=max_distance):
+    """Gets every variant of word with up to depth characters deleted
+
+    :param word: the word to generate variants of
+    :param depth: maximum number of deletions
+    :return: a set of variants, including the word itself
+    """
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i+1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+def _load_dictionary():
+    """Reads and indexes autocorrect.txt, once, on first use
+
+    The index is built by one thread and published by a single
+    assignment, so other threads see no index or the whole of it.
+
+    :return: query_index
+    """
+    global query_index
+    index = query_index
+    if index is None:
+        with query_index_lock:
+            if query_index is None:
+                with open(local_root + "/autocorrect.txt", "r") as f:
+                    dictionary = f.read().split()
+                delete_index = {}
+                for position, word in enumerate(dictionary):
+                    for variant in _deletes(word):
+                        delete_index.setdefault(variant, []).append(position)
+                query_index = dictionary, set(dictionary), delete_index
+            index = query_index
+    return index
 
 
 def correct_word(word):
-    lookup = first_letter_lookup[word[0]]
-    if len(lookup) == 0:
+    """Finds the closest dictionary word within max_distance edits
+
+    Candidates are found through the symmetric-delete index, so the
+    cost of a lookup depends on the length of the word rather than
+    the size of the dictionary.
+
+    Words containing digits are left alone, and a word is never
+    corrected by as many edits as it has characters.
+
+    :param word: the word to correct
+    :return: (distance, corrected word), or (0, word) if nothing is close
+    """
+    dictionary, known_words, delete_index = _load_dictionary()
+    if word in known_words or any(c.isdigit() for c in word):
         return 0, word
 
-    closest_word = word
-    closest_dist = 3
-    for w in lookup:
-        d = damerau_levenshtein_distance(word, w)
+    limit = min(max_distance, len(word) - 1)
+    candidates = set()
+    for variant in _deletes(word, limit):
+        candidates.update(delete_index.get(variant, ()))
+
+    closest_position = None
+    closest_dist = limit + 1
+    for position in sorted(candidates):
+        d = damerau_levenshtein_distance(word, dictionary[position], limit=closest_dist - 1)
         if d < closest_dist:
-            closest_word = w
+            closest_position = position
             closest_dist = d
 
-    if closest_dist == 3:
+    if closest_position is None:
         return 0, word
-    return closest_dist, closest_word
+    return closest_dist, dictionary[closest_position]
 
 
 def correct_passage(passage):
@@ -42,25 +108,219 @@ def correct_passage(passage):
     return dist, "".join(tokens)
 
 
+class Vocabulary:
+    """Words to correct message content against, with how often each is used
+
+    Content is not corrected against the query dictionary, which only
+    holds the words of queries. A word is only corrected when one
+    candidate is clearly better: the word is not in the vocabulary, is
+    at least content_min_length letters long, and the candidate is one
+    edit away (two for words of eight or more letters) and content_ratio
+    times as frequent as any other candidate as close.
+
+    :param words: dict of word -> count, or iterable of words
+    """
+
+    def __init__(self, words=()):
+        self.counts = dict(words) if isinstance(words, dict) else dict.fromkeys(words, 1)
+        self.delete_index = {}  # deletion variant -> words
+        for word in self.counts:
+            if len(word) >= content_min_length - 1:
+                # Words under six letters are only ever one edit from a correctable word
+                for variant in _deletes(word, 1 if len(word) < 6 else max_distance):
+                    self.delete_index.setdefault(variant, []).append(word)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a word list, with one word per line, optionally followed by its count
+
+        :param path: the word list file
+        :return: Vocabulary
+        """
+        counts = {}
+        with open(path, "r", encoding='utf-8') as file:
+            for line in file:
+                fields = line.split()
+                if fields:
+                    counts[fields[0].lower()] = int(fields[1]) if len(fields) > 1 else 1
+        return cls(counts)
+
+    def correct(self, word, count=0):
+        """Finds the clearly best correction of a word
+
+        :param word: the lowercase word to correct
+        :param count: how often the word itself is used, which a correction must also beat
+        :return: (distance, corrected word), or (0, word) to leave it alone
+        """
+        if word in self.counts or len(word) < content_min_length or not word.isalpha():
+            return 0, word
+
+        limit = 1 if len(word) < 8 else max_distance
+        distances = {}
+        for variant in _deletes(word, limit):
+            for candidate in self.delete_index.get(variant, ()):
+                if candidate not in distances:
+                    distances[candidate] = damerau_levenshtein_distance(word, candidate, limit=limit)
+        closest = min(distances.values(), default=limit + 1)
+        if closest > limit:
+            return 0, word
+
+        ranked = sorted(((self.counts[c], c) for c, d in distances.items() if d == closest), reverse=True)
+        best_count, best = ranked[0]
+        rival_count = max([count] + [c for c, _ in ranked[1:]])
+        if best_count < content_ratio * rival_count:
+            return 0, word
+        return closest, best
+
+
+def content_vocabulary(counts, vocabulary=None):
+    """Gets the Vocabulary to correct content with
+
+    :param counts: dict of word -> how often it is used in the content
+    :param vocabulary: a Vocabulary, a word list file (see Vocabulary.load), an iterable of
+        words, or None to use only the content's own frequent words
+    :return: Vocabulary, including every word used at least content_min_count times
+    """
+    frequent = {word: count for word, count in counts.items() if count >= content_min_count}
+    if vocabulary is None:
+        return Vocabulary(frequent)
+    if isinstance(vocabulary, str):
+        vocabulary = Vocabulary.load(vocabulary)
+    elif not isinstance(vocabulary, Vocabulary):
+        vocabulary = Vocabulary(vocabulary)
+    return Vocabulary({**frequent, **vocabulary.counts})
+
+
+def match_case(original, word):
+    """Gives a correction the case of the word it replaces"""
+    if original.isupper() and len(original) > 1:
+        return word.upper()
+    if original[:1].isupper():
+        return word[:1].upper() + word[1:]
+    return word
+
+
+_worker_vocabulary = None
+
+
+def _set_worker_vocabulary(vocabulary):
+    global _worker_vocabulary
+    _worker_vocabulary = vocabulary
+
+
+def _correct_counted(item):
+    return _worker_vocabulary.correct(*item)
+
+
+def correct_tokens(tokens, vocabulary, memo=None, processes=None, counts=None):
+    """Corrects each distinct token of message content once
+
+    Tokens already in memo are not corrected again, so a memo kept
+    between calls (see load_memo and save_memo) makes repeated runs
+    over the same corpus, with the same vocabulary, cheap. A memo must
+    only be reused with the same vocabulary and counts, see memo_fingerprint.
+
+    :param tokens: iterable of lowercase words to correct
+    :param vocabulary: Vocabulary to correct against
+    :param memo: dict of token -> (distance, word) to reuse and fill
+    :param processes: if given, spread the corrections across this many processes
+    :param counts: dict of token -> how often it is used, see Vocabulary.correct
+    :return: the memo, updated with every token
+    """
+    if memo is None:
+        memo = {}
+    counts = counts or {}
+    missing = [(t, counts.get(t, 0)) for t in dict.fromkeys(tokens) if t not in memo]
+
+    if processes and processes > 1 and len(missing) > 1:
+        chunksize = max(1, len(missing) // (processes * 4))
+        with ProcessPoolExecutor(processes, initializer=_set_worker_vocabulary,
+                                 initargs=(vocabulary,)) as executor:
+            memo.update(zip((t for t, _ in missing), executor.map(_correct_counted, missing, chunksize=chunksize)))
+    else:
+        memo.update((t, vocabulary.correct(t, count)) for t, count in missing)
+    return memo
+
+
+def memo_fingerprint(vocabulary, counts=None):
+    """Identifies what corrections depend on, so a memo is only reused when they would be the same
+
+    :param vocabulary: the Vocabulary corrected against
+    :param counts: the counts given to correct_tokens, if any
+    :return: str
+    """
+    rules = [max_distance, content_min_length, content_min_count, content_ratio]
+    key = [rules, sorted(vocabulary.counts.items()), None if counts is None else sorted(counts.items())]
+    return hashlib.sha1(json.dumps(key).encode()).hexdigest()
+
+
+def load_memo(path, fingerprint=None):
+    """Loads a correction memo saved by save_memo
+
+    :param path: the memo file, which does not need to exist yet
+    :param fingerprint: see memo_fingerprint; a memo saved with another one is discarded
+    :return: dict of token -> (distance, word)
+    """
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding='utf-8') as file:
+        saved = json.load(file)
+    if saved.get("fingerprint") != fingerprint or "corrections" not in saved:
+        return {}
+    return {token: tuple(correction) for token, correction in saved["corrections"].items()}
+
+
+def save_memo(memo, path, fingerprint=None):
+    """Saves a correction memo for use by later runs
+
+    :param memo: dict of token -> (distance, word)
+    :param path: the file to write
+    :param fingerprint: see memo_fingerprint
+    :return: None
+    """
+    with open(path, "w", encoding='utf-8') as file:
+        json.dump({"fingerprint": fingerprint, "corrections": memo}, file)
+
+
 def damerau_levenshtein_distance(word1, word2, limit=-1):
-    # Make a table of costs
-    dist = {i:  # think of as the x-axis
-                     {j: i+j+2 for j in range(-1, len(word2))}
-                 for i in range(-1, len(word1))}
-    for i in range(len(word1)):
-        for j in range(len(word2)):
+    """Optimal string alignment distance between two words
+
+    Keeps only the last three rows of the cost table. If limit is
+    non-negative, stops as soon as every path costs more than limit.
+
+    :param word1: the word being edited
+    :param word2: the word to reach
+    :param limit: largest distance of interest, or -1 for no limit
+    :return: the distance, or limit + 1 if it exceeds limit
+    """
+    len1, len2 = len(word1), len(word2)
+    if limit >= 0 and abs(len1 - len2) > limit:
+        return limit + 1
+
+    # Rows of the cost table: i-2, i-1 and i (index j+1 holds column j)
+    two_back = None
+    previous = list(range(len2 + 1))
+    for i in range(len1):
+        current = [i + 1] + [0] * len2
+        for j in range(len2):
             # On insertions to word1: travel vertically on cost table
-            insert_cost = dist[i][j-1] + 1
+            insert_cost = current[j] + 1
             # On deletions from word1: travel horizontally on cost table
-            delete_cost = dist[i-1][j] + 1
+            delete_cost = previous[j+1] + 1
             # On substitutions from word1: del+ins, travel diagonally
-            sub_cost = dist[i-1][j-1] + (0 if word1[i] == word2[j] else 1)
-            min_ex_trans = min(insert_cost, delete_cost, sub_cost)
+            sub_cost = previous[j] + (0 if word1[i] == word2[j] else 1)
+            cost = min(insert_cost, delete_cost, sub_cost)
 
             if i > 0 and j > 0 and word1[i-1] == word2[j] and word1[i] == word2[j-1]:
                 # On transpositions from word1: sub x2, travel diag twice
-                trans_cost = dist[i-2][j-2] + 1
-                dist[i][j] = min(min_ex_trans, trans_cost)
-            else:
-                dist[i][j] = min_ex_trans
-    return dist[len(word1)-1][len(word2)-1]
+                cost = min(cost, two_back[j-1] + 1)
+            current[j+1] = cost
+
+        if limit >= 0 and min(current) > limit:
+            return limit + 1
+        two_back, previous = previous, current
+
+    distance = previous[len2]
+    if limit >= 0 and distance > limit:
+        return limit + 1
+    return distance
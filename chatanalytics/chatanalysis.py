@@ -1,6 +1,8 @@
 import re
 import warnings
 
+import pandas as pd
+
 from chatanalytics import autocorrect, utils
 
 
@@ -13,6 +15,13 @@ class ChatAnalysis:  # stored as GenericChat.analyze
     2) Validate all components
     3) Group by final groups
     4) Aggregate by initial groups, applying operation to target
+
+    Queries may start with "top N" or "bottom N" to keep the N largest or
+    smallest results within each of the other final groups, for example
+    "top 10 senders by messages" or "top 5 words per month by channel".
+
+    Totals the Chat's rollup cube holds (see Chat.set_rollup) are taken
+    from it instead of the messages.
     """
 
     # https://regex101.com/r/NmimVo/5/
@@ -23,6 +32,11 @@ class ChatAnalysis:  # stored as GenericChat.analyze
                                r"(?: (?:per|sorted by|by) ([a-zA-Z]+(?:(?:, and|,| and) [a-zA-Z]+)*))?$")
     # https://regex101.com/r/81gpcU/2/
     decomposer = re.compile(r" by |, and |, | per | and | ")
+    # top|bottom N <query>, or top|bottom N <group> by <query>
+    ranked_query = re.compile(r"^(top|bottom) (\d+) (.+)$")
+    ranked_group = re.compile(r"^([a-zA-Z]+) by (.+)$")
+    # Targets named by more than one word, read as the one-word target
+    target_phrases = re.compile(r"\b(?:response|reply) times?\b")
 
     def __init__(self, parent):
         self._parent = parent
@@ -56,6 +70,8 @@ class ChatAnalysis:  # stored as GenericChat.analyze
             "word": self._target_word,
             "character": self._target_character,
             "duration": self._target_duration,
+            "response": self._target_response,
+            "turn": self._target_turn,
         }
         self.target_subs = self._invert_dict({
             "message": ["messages", "msg", "msgs"],
@@ -63,7 +79,11 @@ class ChatAnalysis:  # stored as GenericChat.analyze
             "word": ["words", "wd", "wds"],
             "character": ["characters", "char", "chars"],
             "duration": ["time", "length"],
+            "response": ["responses", "reply", "replies", "latency"],
+            "turn": ["turns"],
         })
+        # Targets aggregated from a column of Chat.replies, without a per-group apply
+        self.reply_targets = {"response": "mean", "turn": "sum"}
 
         self.groups = {
             "message": self._group_pre_message,
@@ -78,13 +98,15 @@ class ChatAnalysis:  # stored as GenericChat.analyze
         self.group_subs = self._invert_dict({
             "message": ["messages", "msg", "msgs"],
             "conversation": ["conversations", "conv", "convs"],
-            "day": [],
-            "week": ["wk"],
-            "month": ["mo"],
-            "year": ["yr"],
-            "sender": ["person"],
-            "channel": ["chat"],
+            "day": ["days"],
+            "week": ["weeks", "wk"],
+            "month": ["months", "mo"],
+            "year": ["years", "yr"],
+            "sender": ["senders", "person", "people"],
+            "channel": ["channels", "chat", "chats"],
         })
+        # Targets that are sums of a per-message value, see _target_values
+        self.summed_targets = {"message", "word", "character", "turn"}
 
     @staticmethod
     def _invert_dict(dictionary):
@@ -97,17 +119,29 @@ class ChatAnalysis:  # stored as GenericChat.analyze
     ################
 
     def analyze(self, query, *args, **kwargs):
-        dist, query = autocorrect.correct_passage(query.lower())
-        if dist > 0:
-            warnings.warn(f"\nQuery corrected to: '{query}'")
-        args = self._parse_query(query)
-        return self._execute_query(*args)
+        stage = self._stage
+        with stage("analyze") as analyze_stage:
+            with stage("autocorrect"):
+                dist, query = autocorrect.correct_passage(query.lower())
+            if dist > 0:
+                warnings.warn(f"\nQuery corrected to: '{query}'")
+            with stage("parse_query"):
+                ranking, query = self._parse_ranking(query)
+                args = self._parse_query(query)
+            if ranking is None:
+                result = self._execute_query(*args)
+            else:
+                result = self._execute_ranked(ranking, *args)
+            # Operations without final groups give scalars
+            analyze_stage["rows"] = len(result.index) if hasattr(result, "index") else 1
+        return result
 
     ####################
     # Internal methods #
     ####################
 
     def _parse_query(self, query):
+        query = self.target_phrases.sub("response", query)
         if match := self.simple_query.match(query):
             operation = None
             target = match.group(1)
@@ -128,6 +162,26 @@ class ChatAnalysis:  # stored as GenericChat.analyze
 
         return operation, target, igroup, fgroups
 
+    def _parse_ranking(self, query):
+        """Splits a leading top/bottom N clause from a query
+
+        "<group> by <query>" after the clause is read as "<query> by <group>",
+        so "top 10 senders by messages" ranks senders by their messages.
+
+        :return: ((N, whether to keep the largest) or None, the rest of the query)
+        """
+        match = self.ranked_query.match(query)
+        if not match:
+            return None, query
+        ranking = (int(match.group(2)), match.group(1) == "top")
+        query = match.group(3)
+
+        if (match := self.ranked_group.match(query)) \
+                and (match.group(1) in self.groups or match.group(1) in self.group_subs) \
+                and match.group(1) not in self.targets and match.group(1) not in self.target_subs:
+            query = f"{match.group(2)} by {match.group(1)}"
+        return ranking, query
+
     def _decompose(self, query):
         if isinstance(query, str):
             return self.decomposer.split(query)
@@ -168,24 +222,42 @@ class ChatAnalysis:  # stored as GenericChat.analyze
             return None
         return [self._validate_group(g) for g in groups]
 
+    def _stage(self, name):
+        return self._parent._stage(name)
+
     def _execute_query(self, op, target, igroup, fgroups):
+        stage = self._stage
+        if self._rollup_answers(target, igroup, fgroups):
+            with stage("rollup_query"):
+                return self._execute_rollup(op, target, igroup, fgroups)
+
+        messages = self._messages(target)
         if fgroups is None and igroup is not None:
             # Apply initial groupings
-            grouped = self._group(self._parent.messages, igroup)
+            with stage("group") as group_stage:
+                grouped = self._group(messages, igroup)
+                group_stage["rows"] = grouped.ngroups
             # Apply targeting
-            targeted = self._target(grouped, target)
-            operated = self._operate(targeted, op)
+            with stage("target"):
+                targeted = self._target(grouped, target)
+            with stage("operate"):
+                operated = self._operate(targeted, op)
             return operated
         elif fgroups is not None and igroup is None:
             # Apply final groupings
-            grouped = self._group(self._parent.messages, fgroups)
+            with stage("group") as group_stage:
+                grouped = self._group(messages, fgroups)
+                group_stage["rows"] = grouped.ngroups
 
             # Apply targeting (no operation)
-            targeted = self._target(grouped, target)  # group -> series
+            with stage("target"):
+                targeted = self._target(grouped, target)  # group -> series
             return targeted
         elif fgroups is not None and igroup is not None:
             # Apply final groupings
-            grouped = self._group(self._parent.messages, fgroups)
+            with stage("group") as group_stage:
+                grouped = self._group(messages, fgroups)
+                group_stage["rows"] = grouped.ngroups
 
             def process(group):
                 # Apply initial groupings
@@ -195,7 +267,79 @@ class ChatAnalysis:  # stored as GenericChat.analyze
                 operated = self._operate(targeted, op)
                 return operated
 
-            return grouped.apply(process)
+            # Initial groupings, targeting and operations within each final group
+            with stage("target"):
+                return grouped.apply(process)
+
+    ##########
+    # Rollup #
+    ##########
+
+    def _rollup_answers(self, target, igroup, fgroups):
+        """Whether the rollup cube holds the totals a query needs"""
+        groups = (fgroups or []) + ([igroup] if igroup is not None else [])
+        columns = self._parent._rollup_keys + self._parent._rollup_calendar
+        return (target in self._parent._rollup_targets
+                and all(group in columns for group in groups)
+                and len(set(groups)) == len(groups)
+                and self._parent.rollup is not None)
+
+    def _execute_rollup(self, op, target, igroup, fgroups):
+        cube = self._parent.rollup
+        if fgroups is None:
+            return self._operate(cube.groupby(igroup)[target].sum().rename(None), op)
+        if igroup is None:
+            return cube.groupby(fgroups)[target].sum().rename(None)
+        # Totals per initial group within each final group, then the operation across them
+        totals = cube.groupby(fgroups + [igroup])[target].sum().rename(None)
+        return totals.groupby(level=fgroups).apply(lambda series: self._operate(series, op))
+
+    ###########
+    # Ranking #
+    ###########
+
+    def _execute_ranked(self, ranking, op, target, igroup, fgroups):
+        """Executes a query, keeping the top or bottom N of the last final group
+
+        Summed targets without an operation are totalled vectorized, and the
+        N are selected from those totals without a per-group aggregation.
+        """
+        if fgroups is None:
+            raise ValueError("Only queries with final groups can be ranked")
+        n, largest = ranking
+        if op is not None or target not in self.summed_targets or self._rollup_answers(target, igroup, fgroups):
+            return self._select(self._execute_query(op, target, igroup, fgroups), n, largest)
+
+        with self._stage("target"):
+            df = self._add_groups(self._messages(target), fgroups)
+            totals = self._target_values(df, target).groupby([df[g] for g in fgroups]).sum().rename(None)
+        return self._select(totals, n, largest)
+
+    @staticmethod
+    def _select(series, n, largest, keep="first"):
+        """Keeps the n largest or smallest values within each outer index level
+
+        Uses partial selection (nlargest/nsmallest) rather than sorting.
+        """
+        if not isinstance(series, pd.Series):
+            raise ValueError("Only queries with final groups can be ranked")
+        select = "nlargest" if largest else "nsmallest"
+        if series.index.nlevels == 1:
+            return getattr(series, select)(n, keep=keep)
+        outer = list(range(series.index.nlevels - 1))
+        return series.groupby(level=outer, group_keys=False).apply(lambda s: getattr(s, select)(n, keep=keep))
+
+    @staticmethod
+    def _target_values(df, target):
+        """Per-message values that a summed target totals"""
+        if target == "message":
+            return pd.Series(1, index=df.index)
+        elif target == "word":
+            return df.content.str.split().str.len()
+        elif target == "character":
+            return df.content.str.len()
+        else:
+            return df[target]
 
     #########
     # Group #
@@ -204,11 +348,14 @@ class ChatAnalysis:  # stored as GenericChat.analyze
     def _group(self, df, groups):
         if isinstance(groups, str):
             groups = [groups]
-        grouped = df
+        return self._add_groups(df, groups).groupby(groups)
+
+    def _add_groups(self, df, groups):
+        """Adds a column for each group to group by"""
         for group in groups:
             group_func = self.groups[group]
-            grouped = group_func(grouped)
-        return grouped.groupby(groups)
+            df = group_func(df)
+        return df
 
     def _group_pre_message(self, df):
         return df.assign(message=df.index)
@@ -238,7 +385,16 @@ class ChatAnalysis:  # stored as GenericChat.analyze
     # Target from group #
     #####################
 
+    def _messages(self, target):
+        """Gets the parent's messages, with the reply columns a target needs"""
+        messages = self._parent.messages
+        if target in self.reply_targets:
+            messages = messages.assign(**self._parent.replies)
+        return messages
+
     def _target(self, group, target):  # transforms group of dataframes to *series* of scalars
+        if target in self.reply_targets:
+            return group[target].agg(self.reply_targets[target]).rename(None)
         target_func = self.targets[target]
         return group.apply(lambda x: target_func(x))
 
@@ -257,6 +413,12 @@ class ChatAnalysis:  # stored as GenericChat.analyze
     def _target_duration(self, df):
         return df.timestamp.max() - df.timestamp.min()
 
+    def _target_response(self, df):
+        return df.response.mean()
+
+    def _target_turn(self, df):
+        return df.turn.sum()
+
     ######################
     # Operation on group #
     ######################
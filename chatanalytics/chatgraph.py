@@ -1,4 +1,9 @@
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 
 
@@ -13,17 +18,24 @@ class ChatGraph:  # stored as GenericChat.analyze
                                r"(?: (?:per|by|sorted by) ([a-zA-Z]+(?:(?:, |, and| and)[a-zA-Z]+)*))?$")
 
     # https://regex101.com/r/81gpcU/2/
-    decomposer = re.compile(r" by |, |, and | per | and | ")
+    decomposer = re.compile(r" by |, |, and | per | and | ", re.IGNORECASE)
+
+    kinds = ("line", "hist", "bar", "vbar", "kde", "density", "area")
+    # Kinds whose series are downsampled when max_points is set
+    downsampled_kinds = ("line", "area")
 
     def __init__(self, parent):
         self._parent = parent
+        self.max_points = None  # default limit on points along the x axis of line/area graphs
 
-    def _graph(self, query, kind="line", *args, **kwargs):
+    def _graph(self, query, kind="line", max_points=None, *args, **kwargs):
         parsed = self._parse_query(query)
-        return self._generate_graph(query, parsed, kind)
+        if max_points is None:
+            max_points = self.max_points
+        return self._generate_graph(query, parsed, kind, max_points)
 
-    def line(self, query):
-        return self._graph(query, kind="line")
+    def line(self, query, max_points=None):
+        return self._graph(query, kind="line", max_points=max_points)
 
     def hist(self, query):
         return self._graph(query, kind="hist")
@@ -40,8 +52,66 @@ class ChatGraph:  # stored as GenericChat.analyze
     def density(self, query):
         return self._graph(query, kind="density")
 
-    def area(self, query):
-        return self._graph(query, kind="area")
+    def area(self, query, max_points=None):
+        return self._graph(query, kind="area", max_points=max_points)
+
+    def render_batch(self, specs, out_dir, workers=None, file_format="png"):
+        """Renders many graphs to files
+
+        Each distinct query is analyzed once, however many specs use it.
+        Figures are then rendered with Agg, outside pyplot and without
+        changing its backend, in a pool of worker processes if workers
+        is more than 1.
+
+        :param specs: list of dicts with "kind" and "query", and optionally
+            "filename" and "max_points", or of (kind, query) tuples
+        :param out_dir: directory to write files to, created if missing
+        :param workers: number of worker processes to render with
+        :param file_format: file extension used when a spec has no filename
+        :return: DataFrame with query, kind, path, analyze_time and render_time per spec
+        """
+        tasks = []
+        for spec in specs:
+            if not isinstance(spec, dict):
+                spec = dict(zip(("kind", "query"), spec))
+            kind, query = spec["kind"], spec["query"]
+            if kind not in self.kinds:
+                raise ValueError(f"Graph kind '{kind}' is invalid")
+            parsed = self._parse_query(query)
+            if len(self._decompose(parsed['x_groups'])) > 2:
+                raise ValueError(f"Query {query} has too many final groups")
+            filename = spec.get("filename") or f"{kind}_{self._slugify(query)}.{file_format}"
+            max_points = spec.get("max_points", self.max_points)
+            tasks.append((query, parsed, kind, max_points, os.path.join(out_dir, filename)))
+
+        results, analyze_times = {}, {}
+        for query, *_ in tasks:
+            if query not in results:
+                start = time.perf_counter()
+                results[query] = self._parent.analyze(query)
+                analyze_times[query] = time.perf_counter() - start
+
+        os.makedirs(out_dir, exist_ok=True)
+        backend = pd.options.plotting.backend
+        jobs = [(query, parsed, results[query], kind, max_points, path, backend)
+                for query, parsed, kind, max_points, path in tasks]
+        if workers is not None and workers > 1:
+            with ProcessPoolExecutor(workers) as executor:
+                render_times = list(executor.map(_render_to_file, *zip(*jobs)))
+        else:
+            render_times = [_render_to_file(*job) for job in jobs]
+
+        return pd.DataFrame({
+            "query": [task[0] for task in tasks],
+            "kind": [task[2] for task in tasks],
+            "path": [task[4] for task in tasks],
+            "analyze_time": [analyze_times[task[0]] for task in tasks],
+            "render_time": render_times,
+        })
+
+    @staticmethod
+    def _slugify(query):
+        return re.sub(r"[^a-z0-9]+", "_", query.lower()).strip("_")
 
     def _parse_query(self, query):
         if match := self.simple_query.match(query):
@@ -58,15 +128,36 @@ class ChatGraph:  # stored as GenericChat.analyze
         x_groups = x_groups.title()
         return {"y_axis_name":y_axis_name, "x_groups":x_groups, "title":title}
 
-    def _generate_graph(self, query, parsed, kind):
+    def _generate_graph(self, query, parsed, kind, max_points=None):
         splits = self._decompose(parsed['x_groups'])
+        if len(splits) > 2:
+            raise ValueError(f"Query {query} has too many final groups")
+        return self._plot_result(query, parsed, self._parent.analyze(query), kind, max_points)
+
+    @classmethod
+    def _plot_result(cls, query, parsed, result, kind, max_points=None, ax=None):
+        """Plots an analysis result with the current plotting backend
+
+        :param query: the query that produced result
+        :param parsed: the parsed query, from _parse_query
+        :param result: the result of analyzing query
+        :param kind: the kind of graph
+        :param max_points: limit on points along the x axis of line/area graphs, see _downsample
+        :param ax: matplotlib axes to plot on, rather than pyplot's current ones
+        :return: the matplotlib axes or plotly figure
+        """
+        plot_kwargs = {} if ax is None else {"ax": ax}
+        splits = cls.decomposer.split(parsed['x_groups'])
         if len(splits) == 0:
             raise ValueError("No groups were passed to sort by:\n" +
-                                 f" Query {query} returns value {self._parent.analyze(query)}")
+                                 f" Query {query} returns value {result}")
         elif len(splits) == 1:
-            ax = self._parent.analyze(query).plot(
+            if max_points and kind in cls.downsampled_kinds:
+                result = cls._downsample(result, max_points)
+            ax = result.plot(
                 title=parsed['title'],
-                kind=kind
+                kind=kind,
+                **plot_kwargs
             )
 
             if pd.options.plotting.backend == 'matplotlib':
@@ -80,14 +171,16 @@ class ChatGraph:  # stored as GenericChat.analyze
                 )
             return ax
         elif len(splits) == 2:
-            result = self._parent.analyze(query)
             idx = result.index
             if len(idx.unique(level=0)) < len(idx.unique(level=1)) or len(idx.unique(level=0)) < 5:
                 # If x < y or x < 5: Prefer y for the x axis, x for the legend
                 unstacked = result.unstack(level=0)  # unstack x for legend
+                if max_points and kind in cls.downsampled_kinds:
+                    unstacked = cls._downsample(unstacked, max_points)
                 ax = unstacked.plot(
                     title=parsed['title'],
-                    kind=kind
+                    kind=kind,
+                    **plot_kwargs
                 )
 
                 if pd.options.plotting.backend == 'matplotlib':
@@ -103,7 +196,9 @@ class ChatGraph:  # stored as GenericChat.analyze
             else:
                 # Otherwise prefer x for x-axis, y for legend
                 unstacked = result.unstack(level=1)  # unstack y for legend
-                ax = unstacked.plot(title=parsed['title'], kind=kind)
+                if max_points and kind in cls.downsampled_kinds:
+                    unstacked = cls._downsample(unstacked, max_points)
+                ax = unstacked.plot(title=parsed['title'], kind=kind, **plot_kwargs)
 
                 if pd.options.plotting.backend == 'matplotlib':
                     ax.set_xlabel(splits[0])
@@ -124,3 +219,102 @@ class ChatGraph:  # stored as GenericChat.analyze
             return self.decomposer.split(query)
         return None
 
+    @staticmethod
+    def _downsample(data, max_points):
+        """Reduces data to at most max_points rows
+
+        Points are chosen with largest-triangle-three-buckets, which
+        keeps peaks and troughs. The series of a DataFrame share the
+        rows: each gets an equal part of max_points, or if there are too
+        many series for that, points are chosen from the envelope of
+        their largest and smallest values.
+
+        :param data: Series or DataFrame indexed by the x axis
+        :param max_points: number of rows to keep, at least 3
+        :return: data restricted to the chosen rows
+        """
+        if max_points < 3:
+            raise ValueError(f"max_points must be at least 3, not {max_points}")
+        if len(data.index) <= max_points:
+            return data
+        x = _x_values(data.index)
+        values = data.to_numpy(dtype=float, na_value=0).reshape(len(data.index), -1)
+        share = max_points // values.shape[1]
+        if share >= 3:
+            series = [(values[:, i], share) for i in range(values.shape[1])]
+        elif max_points >= 6:
+            series = [(values.max(axis=1), max_points // 2), (values.min(axis=1), max_points - max_points // 2)]
+        else:
+            series = [(values.max(axis=1), max_points)]
+
+        keep = np.zeros(len(data.index), dtype=bool)
+        for y, points in series:
+            keep[largest_triangle_three_buckets(x, y, points)] = True
+        return data[keep]
+
+
+def _render_to_file(query, parsed, result, kind, max_points, path, backend):
+    """Plots an analysis result and saves it, for ChatGraph.render_batch
+
+    :return: seconds taken to render and save
+    """
+    start = time.perf_counter()
+    pd.options.plotting.backend = backend
+    if backend == 'matplotlib':
+        from matplotlib.figure import Figure
+
+        # A figure made outside pyplot is rendered by Agg whatever backend is active, and never shown
+        figure = Figure()
+        ChatGraph._plot_result(query, parsed, result, kind, max_points, ax=figure.add_subplot())
+        figure.savefig(path)
+    else:
+        figure = ChatGraph._plot_result(query, parsed, result, kind, max_points)
+        if path.endswith(".html"):
+            figure.write_html(path)
+        else:
+            figure.write_image(path)
+    return time.perf_counter() - start
+
+
+def _x_values(index):
+    """Numeric x positions of an index, by value where possible"""
+    if pd.api.types.is_numeric_dtype(index):
+        return index.to_numpy(dtype=float)
+    try:
+        return pd.to_datetime(index).asi8.astype(float)
+    except (TypeError, ValueError):
+        return np.arange(len(index), dtype=float)
+
+
+def largest_triangle_three_buckets(x, y, threshold):
+    """Chooses threshold points of (x, y) that keep its visual shape
+
+    The first and last points are always kept. The rest are split into
+    threshold - 2 buckets, and from each bucket the point forming the
+    largest triangle with the previously chosen point and the mean of
+    the next bucket is kept.
+
+    :param x: array of increasing x values
+    :param y: array of y values
+    :param threshold: number of points to keep
+    :return: sorted array of positions of the kept points
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    chosen = np.empty(threshold, dtype=int)
+    chosen[0], chosen[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        areas = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(areas.argmax())
+        chosen[i + 1] = a
+    return chosen
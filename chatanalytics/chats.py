@@ -1,18 +1,28 @@
+import contextlib
+import functools
 import hashlib
 import json
 import os
+import re
+import tempfile
+import threading
 from typing import List
 
+import numpy as np
 import pandas as pd
-import pytz_deprecation_shim
-import tzlocal
-from pandas.util import hash_pandas_object
-from pytz import UnknownTimeZoneError
 
-from .chatanalysis import ChatAnalysis
-from .chatgraph import ChatGraph
+from . import autocorrect, sources, utils
+from .profiling import StageProfiler, null_stage
+from .snapshots import ChatSnapshot
 
-pd.set_option('display.max_columns', None)
+
+def _locked(method):
+    """Runs a Chat method holding the Chat's lock, so writers take turns"""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return locked
 
 
 class Chat:
@@ -20,29 +30,66 @@ class Chat:
 
     _message_columns = ["sender", "timestamp", "channel", "conversation", "source", "content"]
     _conversation_columns = ["startMessage", "endMessage", "start_timestamp", "end_timestamp"]
+    # Parts of a Messenger thread, message_1.json being the newest
+    _messenger_part = re.compile(r"^message_(\d+)\.json$")
+    # Repetitive text columns, stored as categoricals when compacting
+    _compact_columns = ["sender", "channel", "source"]
+    # Rollup cube: keys, calendar levels rolled up from day, and summed targets
+    _rollup_keys = ["day", "sender", "channel"]
+    _rollup_calendar = ["week", "month", "year"]
+    _rollup_targets = ["message", "word", "character"]
 
     _messages: pd.DataFrame
     _conversations: pd.DataFrame
 
-    _analyze_backend: ChatAnalysis
-    _graph_backend: ChatGraph
+    _analyze_backend_factory: "callable" or None
+    _graph_backend: "ChatGraph" or None
 
     _processed: bool
     _hash: int or None
-    _timezone: str or pytz_deprecation_shim._impl__PytzShimTimezone
+    _timezone: "str or pytz_deprecation_shim._impl__PytzShimTimezone"
     _loaded_files: List[str]
+    _normalized_content: pd.Series or None
+    _replies: pd.DataFrame or None
+    _profiler: StageProfiler or None
+    _spilled: List[str]
+    _rollup_enabled: bool
+    _rollup: pd.DataFrame or None
+    _rollup_rows: int
+    _version: int
+    _snapshot: ChatSnapshot or None
+    _lock: threading.RLock
+    _manifest: dict
+    _origins: np.ndarray
 
     def __init__(self):
         self._messages = pd.DataFrame(columns=self._message_columns)
         self._conversations = pd.DataFrame(columns=self._conversation_columns)
 
-        self._analyze_backend = ChatAnalysis(self)
-        self.graph = ChatGraph(self)  # potentially awkward?
+        # Backends are created on first use, see analyze and graph
+        self._analyze_backend_factory = None  # makes a backend for a snapshot, None for ChatAnalysis
+        self._graph_backend = None
 
         self._processed = False
         self._hash = None
         self._timezone = self._get_localtime()
         self._loaded_files = []
+        self._normalized_content = None
+        self._replies = None
+        self._profiler = None
+        self._spilled = []
+        self._rollup_enabled = False
+        self._rollup = None
+        self._rollup_rows = 0  # leading rows of _messages counted in _rollup
+
+        # Writers hold the lock; readers use snapshots, see snapshot
+        self._version = 0
+        self._snapshot = None
+        self._lock = threading.RLock()
+
+        # Loaded sources and the source of each message, see refresh
+        self._manifest = {}  # source path -> {"origin": int, "files": {file path -> size, mtime and digest}}
+        self._origins = np.zeros(0, dtype=np.int64)  # origin of each message, spilled messages first
 
     #############
     # Accessors #
@@ -51,90 +98,399 @@ class Chat:
     @property
     def messages(self):
         if not self._processed:
-            self._post_process()
+            self._process()
         return self._messages
 
     @property
     def conversations(self):
         if not self._processed:
-            self._post_process()
+            self._process()
         return self._conversations
 
+    @property
+    def graph(self):
+        if self._graph_backend is None:
+            from .chatgraph import ChatGraph
+            self._graph_backend = ChatGraph(self)
+        return self._graph_backend
+
+    @property
+    def rollup(self):
+        """Message, word and character totals per day, sender and channel
+
+        Only kept once enabled with set_rollup. Each row also holds the
+        week, month and year of its day, so coarser calendar levels are
+        rolled up by grouping the cube rather than the messages.
+
+        :return: DataFrame with day, sender, channel, week, month, year, message, word
+            and character columns, or None if disabled
+        """
+        if not self._processed:
+            self._process()
+        return self._rollup
+
+    @property
+    def manifest(self):
+        """Files messages were loaded from, as recorded for refresh
+
+        :return: DataFrame with source, path, size, mtime, digest, rows, first_row and last_row
+            columns, one row per file. rows counts the messages kept from the file's source and
+            first_row and last_row are the positions in messages of its first and last
+        """
+        messages = self.messages
+        origins = self._origins
+        if len(origins) != len(messages.index):
+            origins = np.full(len(messages.index), -1)
+        positions = pd.Series(np.arange(len(origins))).groupby(origins).agg(["size", "min", "max"])
+
+        rows = []
+        for source, entry in self._manifest.items():
+            size, first, last = positions.loc[entry["origin"]] if entry["origin"] in positions.index \
+                else (0, None, None)
+            for path, state in entry["files"].items():
+                rows.append((source, path, state["size"], pd.Timestamp(state["mtime"], unit="s", tz="UTC"),
+                             state["digest"], size, first, last))
+        return pd.DataFrame(rows, columns=["source", "path", "size", "mtime", "digest",
+                                           "rows", "first_row", "last_row"])
+
+    @property
+    def normalized_content(self):
+        if self._normalized_content is None or not self._processed:
+            self.normalize()
+        return self._normalized_content
+
+    @property
+    def replies(self):
+        if self._replies is None or not self._processed:
+            self.make_replies()
+        return self._replies
+
     #######################
     # Public data methods #
     #######################
 
     def analyze(self, query):
-        return self._analyze_backend.analyze(query)
+        return self.snapshot().analyze(query)
+
+    def snapshot(self, latest: bool = True) -> ChatSnapshot:
+        """Gets an immutable view of the processed messages
+
+        Snapshots are cheap, sharing columns with the Chat, and one is
+        made per version of the data. They can be queried from other
+        threads while this Chat keeps loading, see ChatSnapshot.
 
-    def load(self, path: str, allow_repeat_load: bool = True):
+        :param latest: whether to process messages loaded since the last
+            snapshot, waiting for any load in progress to finish. If False,
+            the last snapshot is returned as is, without waiting, if there is one
+        :return: ChatSnapshot
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and (not latest or snapshot.version == self._version):
+            return snapshot
+
+        with self._lock:
+            if not self._processed:
+                self._post_process()
+            if self._snapshot is None or self._snapshot.version != self._version:
+                # Published by a single assignment, so readers see the old or new snapshot
+                self._snapshot = ChatSnapshot(self, self._version)
+            return self._snapshot
+
+    @_locked
+    def load(self, path: str, allow_repeat_load: bool = True, memory_budget: int = None, spill_dir: str = None):
         """Loads a single JSON message file
 
+        The file may be inside a zip archive, for example
+        ``export.zip/messages/inbox/chat_1a2b3c/message_1.json``,
+        in which case it is read straight from the archive.
+
+        If memory_budget is given and loaded messages would exceed it,
+        repetitive columns are compacted into categoricals, then loaded
+        messages are spilled to spill_dir until processing. If neither
+        brings memory under budget, MemoryError is raised, before
+        reading the file if its size on disk alone is over budget.
+        The budget only bounds memory while loading: spilled messages
+        are all read back, and compacted columns restored, when
+        messages are processed.
+
+        A Messenger thread folder loads every message_N.json part in it.
+
         :param path: the name of the file to load
         :param _post_process: whether to postprocess data, default True
+        :param memory_budget: bytes that loaded messages may use
+        :param spill_dir: directory to spill loaded messages to when over budget
         :return: None
         """
 
         self._reset_cache()  # Altering data!
 
+        if memory_budget is not None:
+            self._check_memory_budget(memory_budget, spill_dir, self._estimate_size(path))
+
         # Todo: custom error types
         # Todo: restructure unit tests
 
-        if self._type_is_messenger(path):
-            if not allow_repeat_load and path in self._loaded_files:
-                return self
-            self._loaded_files += [os.path.abspath(path)]
-
-            with open(path, "r", encoding='utf-8') as file:
-                data = json.load(file)
-
-            df = self._messenger_pre_process(data)
-        elif parent := self._type_is_discord(path):
-            if not allow_repeat_load and parent in self._loaded_files:
-                return self
-            self._loaded_files += [os.path.abspath(parent)]
-
-            with open(parent + "/channel.json", "r", encoding='utf-8') as file:
-                channel = json.load(file)
-            with open(parent + "/messages.csv", "r", encoding='utf-8') as file:
-                messages = pd.read_csv(file)
-
-            df = self._discord_pre_process(channel, messages)
-        else:
-            raise FileNotFoundError("Cannot auto-type file")
-
-        self._messages = pd.concat([self._messages, df])
+        with self._stage("load") as load_stage:
+            if self._type_is_messenger(path):
+                if not allow_repeat_load and os.path.abspath(path) in self._loaded_files:
+                    return self
+                self._loaded_files += [os.path.abspath(path)]
+                source, files = os.path.abspath(path), [path]
+
+                with self._stage("read") as stage:
+                    with sources.open_text(path) as file:
+                        data = json.load(file)
+                    stage["rows"] = len(data["messages"])
+
+                with self._stage("pre_process") as stage:
+                    df = self._messenger_pre_process(data)
+                    stage["rows"] = len(df.index)
+            elif parts := self._type_is_messenger_thread(path):
+                if not allow_repeat_load and os.path.abspath(path) in self._loaded_files:
+                    return self
+                self._loaded_files += [os.path.abspath(path)]
+                source, files = os.path.abspath(path), parts
+
+                with self._stage("read") as stage:
+                    data = []
+                    for part in parts:
+                        with sources.open_text(part) as file:
+                            data += [json.load(file)]
+                    stage["rows"] = sum(len(d["messages"]) for d in data)
+
+                with self._stage("pre_process") as stage:
+                    df = self._messenger_thread_pre_process(data)
+                    stage["rows"] = len(df.index)
+            elif parent := self._type_is_discord(path):
+                if not allow_repeat_load and os.path.abspath(parent) in self._loaded_files:
+                    return self
+                self._loaded_files += [os.path.abspath(parent)]
+                source, files = os.path.abspath(parent), [parent + "/channel.json", parent + "/messages.csv"]
+
+                with self._stage("read") as stage:
+                    with sources.open_text(parent + "/channel.json") as file:
+                        channel = json.load(file)
+                    with sources.open_text(parent + "/messages.csv") as file:
+                        messages = pd.read_csv(file)
+                    stage["rows"] = len(messages.index)
+
+                with self._stage("pre_process") as stage:
+                    df = self._discord_pre_process(channel, messages)
+                    stage["rows"] = len(df.index)
+            else:
+                raise FileNotFoundError("Cannot auto-type file")
+
+            with self._stage("concat") as stage:
+                # Keep every loaded frame a sorted run, which the stable sort in _post_process takes advantage of
+                if not df['timestamp'].is_monotonic_increasing:
+                    df = df.sort_values("timestamp", kind="stable")
+                self._messages = self._concat_messages([self._messages, df])
+                stage["rows"] = len(self._messages.index)
+            with self._stage("manifest") as stage:
+                self._record_source(source, files, len(df.index))
+                stage["rows"] = len(files)
+            load_stage["rows"] = len(df.index)
+
+            if memory_budget is not None:
+                self._check_memory_budget(memory_budget, spill_dir)
 
         return self
 
-    def batch_load(self, path: str, do_walk: bool = False):
+    @_locked
+    def batch_load(self, path: str, do_walk: bool = False, memory_budget: int = None, spill_dir: str = None):
         """Load a directory of data files
 
-        Lists or walks through the directory and import *all* files
+        Lists or walks through the directory and import *all* files.
+        The directory may be a zip archive, or a directory inside one,
+        in which case files are read straight from the archive.
 
         :param path: The path to the directory
         :param do_walk: whether to walk through the directory,
         :param _post_process: whether to postprocess data, default True
+        :param memory_budget: bytes that loaded messages may use, see load
+        :param spill_dir: directory to spill loaded messages to when over budget
         :return: None
         """
 
         self._reset_cache()  # Altering data!
 
-        if os.path.isfile(path):
-            self.load(path)
+        if sources.isfile(path):
+            self.load(path, memory_budget=memory_budget, spill_dir=spill_dir)
             return
 
-        for (dirpath, dirnames, filenames) in os.walk(path):
-            for f in filenames:
-                if self._type_is_discord(f"{dirpath}/{f}") \
-                        or self._type_is_discord(f"{dirpath}/{f}")\
-                        or self._type_is_messenger(f"{dirpath}/{f}"):
-                    self.load(dirpath + "/" + f, allow_repeat_load=False)
-            if not do_walk:
-                break
+        for load_path, _ in self._find_sources(path, do_walk):
+            self.load(load_path, allow_repeat_load=False, memory_budget=memory_budget, spill_dir=spill_dir)
 
         return self
 
+    @_locked
+    def refresh(self, path: str, do_walk: bool = False):
+        """Brings messages loaded from a directory up to date with it
+
+        Compares the directory against the manifest of loaded files (see
+        manifest). Files whose size and modification time are unchanged
+        are not read; others are digested to tell whether their contents
+        changed. Messages of modified and deleted sources are retracted,
+        then modified and added sources are loaded, so a refreshed export
+        can be dropped over the old one without loading it all again.
+
+        Messages that were also in another source are retracted with the
+        source they were kept from, as duplicates are dropped.
+
+        :param path: the directory, as given to batch_load
+        :param do_walk: whether to walk through the directory
+        :return: dict of "added", "modified" and "deleted" lists of source paths
+        """
+        root = os.path.abspath(path)
+        tracked = {source: entry for source, entry in self._manifest.items()
+                   if source == root or source.startswith(root + os.sep)}
+
+        with self._stage("refresh") as stage:
+            changes = {"added": [], "modified": [], "deleted": []}
+            for source, entry in tracked.items():
+                change = self._check_source(source, entry)
+                if change is not None:
+                    changes[change] += [source]
+
+            known = {file for entry in self._manifest.values() for file in entry["files"]}
+            found = [(path, root)] if sources.isfile(path) else self._find_sources(path, do_walk, known)
+            added = {}
+            for load_path, source in found:
+                if source not in tracked and source not in added:
+                    added[source] = load_path
+            changes["added"] = list(added)
+            stage["rows"] = sum(len(paths) for paths in changes.values())
+
+        retracted = changes["modified"] + changes["deleted"]
+        if retracted:
+            with self._stage("retract") as stage:
+                self._retract([tracked[source]["origin"] for source in retracted])
+                for source in retracted:
+                    del self._manifest[source]
+                self._loaded_files = [f for f in self._loaded_files if f not in retracted]
+                stage["rows"] = len(self._messages.index)
+
+        for load_path in changes["modified"] + list(added.values()):
+            self.load(load_path)
+
+        return changes
+
+    def watch(self, path: str, do_walk: bool = False, interval: float = 60.0, stop=None, callback=None):
+        """Refreshes from a directory every interval seconds
+
+        Blocks until stop is set, so is usually run in its own thread.
+        After each refresh that changed anything, a new snapshot is
+        processed, so readers (see snapshot) move on to it.
+
+        :param path: the directory, see refresh
+        :param do_walk: whether to walk through the directory
+        :param interval: seconds between refreshes
+        :param stop: threading.Event ending the watch, or None to watch forever
+        :param callback: called with refresh's result whenever anything changed
+        :return: self
+        """
+        stop = stop if stop is not None else threading.Event()
+        while True:
+            changes = self.refresh(path, do_walk)
+            if any(changes.values()):
+                self.snapshot()
+                if callback is not None:
+                    callback(changes)
+            if stop.wait(interval):
+                return self
+
+    @contextlib.contextmanager
+    def profile(self, sink=None, memory=True):
+        """Profiles loading, processing and analysis within a with block
+
+        Records wall time, row counts and memory growth of each stage,
+        such as read, pre_process, concat, sort, make_conversations,
+        autocorrect, parse_query, group and target::
+
+            with chat.profile() as profiler:
+                chat.batch_load(path)
+                chat.analyze("messages per day")
+            profiler.summary()
+
+        :param sink: callable given each stage's record (a dict) as it finishes
+        :param memory: whether to trace memory growth, which slows stages down
+        :return: context manager giving a StageProfiler
+        """
+        previous = self._profiler
+        self._profiler = StageProfiler(sink=sink, memory=memory).start()
+        try:
+            yield self._profiler
+        finally:
+            self._profiler.stop()
+            self._profiler = previous
+
+    @_locked
+    def normalize(self, vocabulary=None, memo_path: str = None, processes: int = None):
+        """Spelling-normalizes the content of every message
+
+        Content is split into words once, each distinct word is
+        corrected once against a content vocabulary (see
+        autocorrect.Vocabulary), and corrections replace the words they
+        correct, keeping the text around them and the words' case. The
+        result is cached as normalized_content.
+
+        :param vocabulary: words to correct against: an autocorrect.Vocabulary, a word
+            list file or an iterable of words. Words used often in the messages are
+            always included, and by default are the whole vocabulary
+        :param memo_path: file to reuse and save corrections in across runs. Corrections saved
+            with another vocabulary or other word counts are discarded
+        :param processes: number of processes to correct words with
+        :return: None
+        """
+        content = self.messages.content.astype(str)
+        with self._stage("tokenize") as stage:
+            pieces = content.str.split(autocorrect.word_split).explode().fillna("")
+            lowered = pieces.str.lower()
+            counts = lowered[pieces.str.fullmatch(autocorrect.word_match.pattern)].value_counts().to_dict()
+            stage["rows"] = len(pieces.index)
+
+        with self._stage("autocorrect") as stage:
+            words = list(counts)
+            # Without a given vocabulary, corrections must also be more frequent than the word
+            own_counts = counts if vocabulary is None else None
+            vocabulary = autocorrect.content_vocabulary(counts, vocabulary)
+            memo = {}
+            if memo_path is not None:
+                fingerprint = autocorrect.memo_fingerprint(vocabulary, own_counts)
+                memo = autocorrect.load_memo(memo_path, fingerprint)
+            memo = autocorrect.correct_tokens(words, vocabulary, memo, processes=processes, counts=own_counts)
+            if memo_path is not None:
+                autocorrect.save_memo(memo, memo_path, fingerprint)
+            stage["rows"] = len(words)
+
+        with self._stage("map_corrections") as stage:
+            corrections = {word: memo[word][1] for word in words if memo[word][1] != word}
+            corrected = lowered.map(corrections)
+            changed = corrected.notna()
+            corrected[changed] = [autocorrect.match_case(original, word)
+                                  for original, word in zip(pieces[changed], corrected[changed])]
+            corrected = corrected.fillna(pieces)
+            self._normalized_content = corrected.groupby(level=0).agg("".join).reindex(content.index, fill_value="")
+            stage["rows"] = len(content.index)
+
+        return self
+
+    @_locked
+    def make_replies(self):
+        """Finds turns and response times of every message
+
+        See utils.find_replies. The result is cached as replies.
+
+        :return: None
+        """
+        messages = self.messages
+        with self._stage("make_replies") as stage:
+            self._replies = utils.find_replies(messages)
+            stage["rows"] = len(messages.index)
+
+        return self
+
+    @_locked
     def clear(self):
         """Clears all messages in the conversation
 
@@ -144,24 +500,58 @@ class Chat:
         self._reset_cache()  # Altering data!
 
         self._messages = self._messages.iloc[0:0]
+        self._remove_spilled()
+        self._rollup = None
+        self._manifest = {}
+        self._origins = self._origins[:0]
 
         return self
 
+    def memory_report(self):
+        """Breaks down deep memory use by column
+
+        Covers messages, conversations and caches, including the rollup
+        cube, and the size on disk
+        of any messages spilled by a memory budget.
+
+        :return: DataFrame with frame, column and bytes columns
+        """
+        frames = {"messages": self._messages, "conversations": self._conversations}
+        if self._normalized_content is not None:
+            frames["normalized_content"] = self._normalized_content.to_frame("normalized_content")
+        if self._replies is not None:
+            frames["replies"] = self._replies
+        if self._rollup is not None:
+            frames["rollup"] = self._rollup
+
+        rows = []
+        for name, frame in frames.items():
+            for column, size in frame.memory_usage(deep=True).items():
+                rows.append((name, column, int(size)))
+        for spilled in self._spilled:
+            rows.append(("spilled", os.path.basename(spilled), os.path.getsize(spilled)))
+        return pd.DataFrame(rows, columns=["frame", "column", "bytes"])
+
+    @_locked
     def set_timezone(self, timezone=None):
         """Sets the timezone to use
 
         :param timezone: None, tz name (str), or tzlocal/pytz object"""
         self._reset_cache()
+        self._rollup = None  # days start at a different time
 
         if timezone is None:
             self._timezone = self._get_localtime()
         else:
             self._timezone = timezone
 
+        # Replace rather than write to frames, which snapshots may share
         if not self._messages.empty:
-            self._messages['timestamp'] = self._messages['timestamp'].dt.tz_convert(self._timezone)
-            self._conversations['start_timestamp'] = self._conversations['start_timestamp'].dt.tz_convert(self._timezone)
-            self._conversations['end_timestamp'] = self._conversations['end_timestamp'].dt.tz_convert(self._timezone)
+            self._messages = self._messages.assign(timestamp=self._messages['timestamp'].dt.tz_convert(self._timezone))
+        if not self._conversations.empty:
+            self._conversations = self._conversations.assign(
+                start_timestamp=self._conversations['start_timestamp'].dt.tz_convert(self._timezone),
+                end_timestamp=self._conversations['end_timestamp'].dt.tz_convert(self._timezone))
 
         return self
 
@@ -171,44 +561,197 @@ class Chat:
 
         return self
 
+    @_locked
+    def set_rollup(self, enabled=True):
+        """Keeps a rollup cube of totals for analyze to answer from
+
+        Queries of message, word or character totals grouped by calendar
+        levels, sender and channel are answered from the cube (see rollup)
+        instead of the messages. The cube is built when messages are
+        processed, and afterwards only messages loaded since are added.
+
+        :param enabled: whether to keep the cube
+        :return: self
+        """
+        self._reset_cache()
+        self._rollup_enabled = enabled
+        self._rollup = None
+
+        return self
+
+    @_locked
+    def set_analyze_backend(self, backend="pandas", database=":memory:"):
+        """Sets how analyze executes queries
+
+        :param backend: "pandas" to group in memory, or "sql" to run queries in
+            an embedded SQLite database (see ChatSQL)
+        :param database: for "sql", path of the database file, or ":memory:"
+        :return: self
+        """
+        if backend == "pandas":
+            self._analyze_backend_factory = None
+        elif backend == "sql":
+            from .chatsql import ChatSQL, SQLStore
+            # One store for all snapshots, which keeps each version's messages in a table of its own
+            self._analyze_backend_factory = functools.partial(ChatSQL, database=SQLStore(database))
+        else:
+            raise ValueError(f"Backend '{backend}' is invalid")
+        # Snapshots keep the backend they were made with
+        self._snapshot = None
+
+        return self
+
     ######################
     # Internal Functions #
     ######################
 
     def _type_is_messenger(self, path: str) -> False or str:
-        if not os.path.isfile(path):
+        if not sources.isfile(path):
             return False
 
         _, extension = os.path.splitext(path)
         if extension != ".json":
             return False
 
-        with open(path, "r", encoding='utf-8') as file:
+        with sources.open_text(path) as file:
             data = json.load(file)
         if "magic_words" not in data:
             return False
 
         return path
 
+    def _type_is_messenger_thread(self, path: str) -> False or List[str]:
+        """Finds the message_N.json parts of a Messenger thread folder
+
+        :return: paths of the parts, message_1.json first, or False
+        """
+        if not sources.isdir(path):
+            return False
+        parts = sorted((int(match.group(1)), f) for f in sources.listdir(path)
+                       if (match := self._messenger_part.match(f)))
+        if not parts:
+            return False
+        return [f"{path}/{f}" for _, f in parts]
+
     def _type_is_discord(self, path: str) -> False or str:
-        if not os.path.isfile(path):
-            if not os.path.isdir(path):
+        if not sources.isfile(path):
+            if not sources.isdir(path):
                 return False
-            if "messages.csv" and "channel.json" in os.listdir(path):
+            if "messages.csv" and "channel.json" in sources.listdir(path):
                 return path
 
         if path.endswith("channel.json"):
             parent = os.path.dirname(path)
-            if "messages.csv" in os.listdir(parent):
+            if "messages.csv" in sources.listdir(parent):
                 return parent
         elif path.endswith("messages.csv"):
             parent = os.path.dirname(path)
-            if "channel.json" in os.listdir(parent):
+            if "channel.json" in sources.listdir(parent):
                 return parent
 
         return False
 
+    def _find_sources(self, path, do_walk=False, known=()):
+        """Finds the sources batch_load loads from a directory
+
+        :param path: the directory
+        :param do_walk: whether to walk through the directory
+        :param known: paths of files to skip without reading
+        :return: iterator of (path to load, source path in the manifest)
+        """
+        for (dirpath, dirnames, filenames) in sources.walk(path):
+            if self._type_is_messenger_thread(dirpath):
+                # Load the parts of a thread together
+                yield dirpath, os.path.abspath(dirpath)
+                filenames = [f for f in filenames if not self._messenger_part.match(f)]
+            discord = False
+            for f in filenames:
+                file = f"{dirpath}/{f}"
+                if os.path.abspath(file) in known:
+                    continue
+                if not discord and (parent := self._type_is_discord(file)):
+                    # Either file of a channel loads the channel folder, once
+                    discord = True
+                    yield parent, os.path.abspath(parent)
+                elif self._type_is_messenger(file):
+                    yield file, os.path.abspath(file)
+            if not do_walk:
+                break
+
+    def _source_files(self, source):
+        """Files making up a source as load reads it, or None if it is gone"""
+        if sources.isfile(source):
+            return [source]
+        if parts := self._type_is_messenger_thread(source):
+            return parts
+        files = [source + "/channel.json", source + "/messages.csv"]
+        if sources.isdir(source) and all(sources.isfile(f) for f in files):
+            return files
+        return None
 
+    @staticmethod
+    def _file_state(path):
+        return {"size": sources.getsize(path), "mtime": sources.getmtime(path), "digest": sources.digest(path)}
+
+    def _record_source(self, source, files, rows):
+        """Records a loaded source in the manifest, and its messages as coming from it
+
+        :param source: path of the source, as in _loaded_files
+        :param files: files read from it
+        :param rows: number of messages loaded from it
+        :return: None
+        """
+        entry = self._manifest.get(source)
+        if entry is None:
+            origin = max((entry["origin"] for entry in self._manifest.values()), default=-1) + 1
+            entry = self._manifest[source] = {"origin": origin}
+        entry["files"] = {os.path.abspath(file): self._file_state(file) for file in files}
+        self._origins = np.concatenate([self._origins, np.full(rows, entry["origin"], dtype=np.int64)])
+
+    def _check_source(self, source, entry):
+        """Compares a source against its manifest entry
+
+        Files with their recorded size and modification time are taken
+        as unchanged; others are digested, and if only their modification
+        time changed it is updated in the entry.
+
+        :return: "modified", "deleted", or None if unchanged
+        """
+        files = self._source_files(source)
+        if files is None:
+            return "deleted"
+        if {os.path.abspath(file) for file in files} != set(entry["files"]):
+            return "modified"
+        for file, state in entry["files"].items():
+            size, mtime = sources.getsize(file), sources.getmtime(file)
+            if size == state["size"] and mtime == state["mtime"]:
+                continue
+            if size != state["size"] or sources.digest(file) != state["digest"]:
+                return "modified"
+            state["mtime"] = mtime
+        return None
+
+    def _retract(self, origins):
+        """Removes the messages loaded from sources
+
+        Processes messages first, so every message's origin is known.
+        Conversations are numbered again the next time messages are
+        processed, and retracted messages are subtracted from the
+        rollup cube, if there is one.
+
+        :param origins: manifest origins of the sources
+        :return: None
+        """
+        if not self._processed:
+            self._post_process()
+        retracted = np.isin(self._origins, origins)
+        if self._rollup is not None:
+            self._update_rollup(self._messages[retracted], sign=-1)
+
+        self._reset_cache()  # Altering data!
+        self._messages = self._messages[~retracted].reset_index(drop=True)
+        self._origins = self._origins[~retracted]
+        self._rollup_rows = len(self._messages.index)
 
     def _pre_process(self, data: [dict, pd.DataFrame]) -> pd.DataFrame:
         """Processes data before adding to data record
@@ -238,16 +781,38 @@ class Chat:
 
         :param data: dict or DataFrame with data
         :return: Dataframe of processed data"""
-        df = pd.DataFrame(data["messages"])
+        return self._messenger_thread_pre_process([data])
+
+    def _messenger_thread_pre_process(self, data: List[dict]) -> pd.DataFrame:
+        """Processes the parts of a Messenger thread together
+
+        Parts are newest first, and so are the messages in each part,
+        so the thread is put in order by reversing both rather than by
+        sorting. Text is decoded from Messenger's latin-1 escapes in one
+        pass over the whole thread.
+
+        :param data: parsed message_N.json files, message_1.json first
+        :return: Dataframe of processed data"""
+        parts = [d for d in data if "magic_words" in d]
+        if not parts:
+            raise FileNotFoundError("Cannot auto-type file")
+
+        df = pd.DataFrame([message for part in reversed(parts) for message in reversed(part["messages"])])
+        df = df.reindex(columns=list(dict.fromkeys(["sender_name", "timestamp_ms", "content", "type",
+                                                    "is_unsent", *df.columns])))
         df = df.rename(columns={"sender_name": "sender"})
-        df = df.assign(channel=data["title"])
+        df = df.assign(channel=utils.decode_latin1_escape(parts[0]["title"]))
 
         # Remove extraneous messages
         df = df[
             (df['type'] == "Generic") &
-            (df['is_unsent'] == False) &
+            (df['is_unsent'] != True) &
             (~df['content'].isna())].copy()
 
+        # Undo Messenger's encoding of text
+        df['content'] = utils.decode_latin1_escapes(df['content'])
+        df['sender'] = utils.decode_latin1_escapes(df['sender'])
+
         # Swap to using DateTimes
         df['timestamp'] = pd.to_datetime(df['timestamp_ms'], unit="ms", errors='coerce') \
             .dt.tz_localize('UTC') \
@@ -256,9 +821,9 @@ class Chat:
         # Drop extra columns
         df = df.drop(columns=[col for col in df if col not in self._message_columns])
 
-        # Reindex and label
-        if df.shape[0] > 1 and df.iloc[0].loc["timestamp"] > df.iloc[1].loc["timestamp"]:
-            df = df.reindex(index=df.index[::-1])
+        # Parts are expected newest first; fall back to sorting if they were not
+        if not df['timestamp'].is_monotonic_increasing:
+            df = df.sort_values("timestamp", kind="stable")
         df = df.assign(source="Facebook Messenger")
         df = df.assign(conversation=0)
 
@@ -305,6 +870,13 @@ class Chat:
         df = df.assign(conversation=0)
         return df
 
+    def _process(self):
+        """Processes loaded messages, unless another thread just did"""
+        with self._lock:
+            if not self._processed:
+                self._post_process()
+
+    @_locked
     def _post_process(self):
         """Processes entire data after adding to record
 
@@ -313,13 +885,98 @@ class Chat:
         :return: None"""
         self._reset_cache()  # Altering data!
 
-        self._messages = self._messages.sort_values("timestamp", ignore_index=True)
-        self._messages = self._messages.drop_duplicates(ignore_index=True)
-
-        self._make_conversations()
+        with self._stage("post_process") as post_process_stage:
+            if self._spilled:
+                with self._stage("unspill") as stage:
+                    self._messages = self._concat_messages(
+                        [self._read_spilled(spilled) for spilled in self._spilled] + [self._messages])
+                    self._remove_spilled()
+                    stage["rows"] = len(self._messages.index)
+            # Compacting to fit a memory budget must not change results
+            self._messages = self._expand(self._messages)
+            origins = self._origins
+            if len(origins) < len(self._messages.index):
+                # Messages loaded by older versions come first, from no known source
+                origins = np.concatenate([np.full(len(self._messages.index) - len(origins), -1), origins])
+            with self._stage("sort") as stage:
+                order = self._sort_order(self._messages)
+                merged = self._messages.take(order).reset_index(drop=True)
+                stage["rows"] = len(merged.index)
+            with self._stage("drop_duplicates") as stage:
+                # Conversations are numbered again below, so loaded and processed copies match
+                kept = ~merged.duplicated(subset=[col for col in merged if col != "conversation"]).to_numpy()
+                self._messages = merged[kept].reset_index(drop=True)
+                self._origins = origins[order][kept]
+                stage["rows"] = len(self._messages.index)
+            if self._rollup_enabled:
+                with self._stage("rollup") as stage:
+                    # Messages loaded since the cube was built follow the ones counted in it
+                    covered = self._rollup_rows if self._rollup is not None else 0
+                    self._update_rollup(merged[kept & (order >= covered)])
+                    self._rollup_rows = len(self._messages.index)
+                    stage["rows"] = len(self._rollup.index)
+
+            with self._stage("make_conversations") as stage:
+                self._make_conversations()
+                stage["rows"] = len(self._conversations.index)
+            post_process_stage["rows"] = len(self._messages.index)
 
         self._processed = True
 
+    @staticmethod
+    def _sort_order(df):
+        """Positions that stably sort messages by timestamp
+
+        Loaded frames are kept sorted, and numpy's stable sort merges
+        such presorted runs rather than sorting them again.
+
+        :param df: messages
+        :return: int array of positions in df
+        """
+        if df.empty:
+            return np.arange(0)
+
+        timestamps = df['timestamp']
+        keys = timestamps.array.asi8.copy()
+        # Sort missing timestamps last, as sort_values does
+        keys[timestamps.isna().to_numpy()] = np.iinfo(np.int64).max
+        return np.argsort(keys, kind="stable")
+
+    def _update_rollup(self, df, sign=1):
+        """Adds messages to the rollup cube, building it if there is none
+
+        :param df: messages not yet counted in the cube
+        :param sign: -1 to subtract messages counted in the cube instead
+        :return: None
+        """
+        content = df["content"]
+        rows = pd.DataFrame({
+            # Local midnight, as dates are taken in the Chat's timezone
+            "day": df["timestamp"].dt.tz_localize(None).dt.normalize(),
+            "sender": df["sender"],
+            "channel": df["channel"],
+            "message": sign,
+            "word": sign * content.str.split().str.len(),
+            "character": sign * content.str.len(),
+        })
+        if self._rollup is not None:
+            previous = self._rollup[self._rollup_keys + self._rollup_targets]
+            rows = pd.concat([previous.assign(day=pd.to_datetime(previous["day"])), rows])
+        cube = rows.groupby(self._rollup_keys, dropna=False, observed=True)[self._rollup_targets] \
+            .sum().reset_index()
+        cube = cube[cube["message"] != 0].reset_index(drop=True)
+
+        # Roll days up to the dates utils gives each calendar level
+        day = cube["day"]
+        levels = {
+            "week": day - pd.to_timedelta(day.dt.dayofweek, unit="D"),
+            "month": day - pd.to_timedelta(day.dt.day - 1, unit="D"),
+            "year": day - pd.to_timedelta(day.dt.dayofyear - 1, unit="D"),
+        }
+        for level in ["day"] + self._rollup_calendar:
+            cube[level] = (levels[level] if level in levels else day).dt.date
+        self._rollup = cube[self._rollup_keys + self._rollup_calendar + self._rollup_targets]
+
     def _make_conversations(self, df=None):
         """Groups messages into conversations
 
@@ -359,15 +1016,125 @@ class Chat:
         ends = gaps.shift(periods=-1, fill_value=True)
         self._conversations["end_timestamp"] = self._messages.timestamp[ends].reset_index(drop=True)
 
+    def _concat_messages(self, frames):
+        """Concatenates message frames, keeping compacted columns categorical
+
+        :param frames: list of message DataFrames
+        :return: DataFrame of all messages
+        """
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return self._messages.iloc[0:0]
+        if len(frames) == 1:
+            # Concatenating onto an empty frame would make every column object
+            return frames[0].reindex(columns=self._message_columns)
+
+        compacted = [column for column in self._compact_columns
+                     if any(isinstance(df[column].dtype, pd.CategoricalDtype) for df in frames)]
+        if compacted:
+            # Categoricals only stay categorical when concatenated with identical categories
+            categories = {column: list(dict.fromkeys(value for df in frames for value in df[column].unique()
+                                                     if pd.notna(value)))
+                          for column in compacted}
+            frames = [df.assign(**{column: pd.Categorical(df[column], categories=categories[column])
+                                   for column in compacted})
+                      for df in frames]
+        return pd.concat(frames)
+
+    def _estimate_size(self, path):
+        """Estimates memory needed to load a file or folder
+
+        Covers every file load would read for path, such as both files
+        of a Discord channel given either of them, or every part of a
+        Messenger thread. Uses the size on disk, which is a lower bound:
+        loaded messages take more memory than their files."""
+        files = self._source_files(self._type_is_discord(path) or path)
+        return sum(sources.getsize(file) for file in files or [])
+
+    def _check_memory_budget(self, memory_budget, spill_dir=None, incoming=0):
+        """Keeps loaded messages plus incoming bytes within memory_budget
+
+        Compacts, then spills loaded messages, then raises MemoryError.
+
+        :param memory_budget: bytes that loaded messages may use
+        :param spill_dir: directory to spill loaded messages to, if any
+        :param incoming: bytes about to be loaded
+        :return: None
+        """
+        usage = self._messages.memory_usage(deep=True).sum()
+        if usage + incoming <= memory_budget:
+            return
+
+        with self._stage("compact") as stage:
+            self._messages = self._compact(self._messages)
+            stage["rows"] = len(self._messages.index)
+        usage = self._messages.memory_usage(deep=True).sum()
+        if usage + incoming <= memory_budget:
+            return
+
+        if spill_dir is not None:
+            if not self._messages.empty:
+                with self._stage("spill") as stage:
+                    os.makedirs(spill_dir, exist_ok=True)
+                    handle, spilled = tempfile.mkstemp(prefix="messages_", suffix=".p", dir=spill_dir)
+                    os.close(handle)
+                    self._messages.to_pickle(spilled)
+                    self._spilled += [spilled]
+                    stage["rows"] = len(self._messages.index)
+                    self._messages = self._messages.iloc[0:0]
+            if incoming <= memory_budget:
+                return
+
+        raise MemoryError(f"Loaded messages use {usage} bytes and {incoming} more bytes are being loaded, "
+                          f"over the memory budget of {memory_budget} bytes")
+
+    def _compact(self, df):
+        """Stores repetitive text columns as categoricals"""
+        return df.astype({column: "category" for column in self._compact_columns
+                          if not isinstance(df[column].dtype, pd.CategoricalDtype)})
+
+    def _expand(self, df):
+        """Restores columns stored as categoricals by _compact to the dtype of their values"""
+        return df.astype({column: df[column].cat.categories.dtype for column in self._compact_columns
+                          if isinstance(df[column].dtype, pd.CategoricalDtype)})
+
+    def _read_spilled(self, spilled):
+        df = pd.read_pickle(spilled)
+        # Spilled messages may predate a set_timezone
+        df["timestamp"] = df["timestamp"].dt.tz_convert(self._timezone)
+        return df
+
+    def _remove_spilled(self):
+        for spilled in self._spilled:
+            if os.path.isfile(spilled):
+                os.remove(spilled)
+        self._spilled = []
+
+    def _stage(self, name):
+        """Context manager timing a stage, if profiling (see profile)
+
+        :param name: name of the stage
+        :return: context manager giving the stage's record, to set "rows" in
+        """
+        if self._profiler is None:
+            return null_stage
+        return self._profiler.stage(name)
+
     def _reset_cache(self):
         """Reset hash and internals if data changes"""
+        self._version += 1
         self._hash = None
         self._processed = False
+        self._normalized_content = None
+        self._replies = None
 
     @staticmethod
     def _get_localtime():
         # Unix may not support get_localzone_name,
         # but otherwise avoid pytz get_localzone
+        import tzlocal
+        from pytz import UnknownTimeZoneError
+
         try:
             return tzlocal.get_localzone_name()
         except UnknownTimeZoneError:
@@ -384,10 +1151,23 @@ class Chat:
         return (self.messages.equals(other.messages)
                 and self.conversations.equals(other.conversations))
 
+    def __getstate__(self):
+        # Profilers may hold unpicklable sinks and only last for a with block
+        state = self.__dict__.copy()
+        state["_profiler"] = None
+        # Locks cannot be pickled, nor can the database connections snapshots may hold
+        del state["_lock"]
+        state["_snapshot"] = None
+        return state
+
+    def __setstate__(self, state):
+        # Pickles from older versions may lack newer attributes
+        self.__init__()
+        state.pop("graph", None)
+        state.pop("_analyze_backend", None)
+        self.__dict__.update(state)
+
     def __hash__(self):
         if self._hash is None:
-            self._hash = 0
-            self._hash += hash_pandas_object(self.messages, index=True).sum()
-            self._hash += hash_pandas_object(self.conversations, index=True).sum()
-            self._hash %= 2**64
+            self._hash = utils.hash_frames(self.messages, self.conversations)
         return self._hash
@@ -0,0 +1,331 @@
+import hashlib
+import math
+import sqlite3
+import statistics
+import threading
+import weakref
+
+import pandas as pd
+
+from .chatanalysis import ChatAnalysis
+from .profiling import null_stage
+
+
+class SQLStore:
+    """Messages of each version of a Chat, in one SQLite database
+
+    Shared by the ChatSQLs of a Chat's snapshots. Each version of the
+    data (see ChatSQL._version) is written once, to a table of its own
+    that is never rewritten, so snapshots of different versions can be
+    queried at the same time. Tables no ChatSQL uses any more are
+    dropped when another version is stored; the latest is kept, so the
+    database can be reopened with ChatSQL(None, path).
+
+    :param database: path of the database file, or ":memory:"
+    """
+
+    chunksize = 100000  # messages written per insert
+
+    def __init__(self, database=":memory:"):
+        self.database = database
+        self.connection = sqlite3.connect(database, check_same_thread=False)
+        self.connection.create_aggregate("median", 1, _Median)
+        self.connection.create_aggregate("stdev", 1, _Stdev)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS versions "
+                                    "(version TEXT PRIMARY KEY, name TEXT, stored INTEGER)")
+        self._users = weakref.WeakSet()  # ChatSQLs, whose tables are kept
+        self._lock = threading.Lock()  # so each version is stored once
+
+    def table(self, analysis, version):
+        """Gets the table holding a version, writing the analysis' parent's messages to it if needed
+
+        :param analysis: the ChatSQL that will query the table
+        :param version: version of the parent's data
+        :return: name of the table
+        """
+        with self._lock:
+            name = self._find(version)
+            if name is None:
+                name = self._store(analysis, version)
+            analysis._table = name
+            self._users.add(analysis)
+        return name
+
+    def latest(self):
+        """Gets the table of the last version stored, or None if there is none"""
+        row = self.connection.execute("SELECT name FROM versions ORDER BY stored DESC LIMIT 1").fetchone()
+        return None if row is None else row[0]
+
+    def close(self):
+        self.connection.close()
+
+    ####################
+    # Internal methods #
+    ####################
+
+    def _find(self, version):
+        row = self.connection.execute("SELECT name FROM versions WHERE version = ?", (version,)).fetchone()
+        return None if row is None else row[0]
+
+    def _store(self, analysis, version):
+        name = "messages_" + hashlib.sha1(version.encode()).hexdigest()[:16]
+        messages = analysis._parent.messages
+        replies = analysis._parent.replies
+        with analysis._stage("store") as store_stage, self.connection:
+            self.connection.execute(f"DROP TABLE IF EXISTS {name}")
+            self.connection.execute(f"""
+                CREATE TABLE {name} (
+                    message INTEGER PRIMARY KEY,
+                    sender TEXT,
+                    timestamp INTEGER,
+                    local_seconds INTEGER,
+                    channel TEXT,
+                    conversation INTEGER,
+                    source TEXT,
+                    content TEXT,
+                    words INTEGER,
+                    turn INTEGER,
+                    response INTEGER
+                )
+            """)
+            for start in range(0, len(messages.index), self.chunksize):
+                ChatSQL._rows(messages.iloc[start:start + self.chunksize],
+                              replies.iloc[start:start + self.chunksize]).to_sql(
+                    name, self.connection, if_exists="append", index=False)
+            for column in ["timestamp", "channel", "sender"]:
+                self.connection.execute(f"CREATE INDEX {name}_{column} ON {name} ({column})")
+            stored = self.connection.execute("SELECT COALESCE(MAX(stored), 0) + 1 FROM versions").fetchone()[0]
+            # Published with the table, so other readers see a version once it is complete
+            self.connection.execute("INSERT INTO versions VALUES (?, ?, ?)", (version, name, stored))
+            store_stage["rows"] = len(messages.index)
+        self._drop_unused(keep=name)
+        return name
+
+    def _drop_unused(self, keep):
+        used = {analysis._table for analysis in list(self._users)} | {keep}
+        for (name,) in self.connection.execute("SELECT name FROM versions").fetchall():
+            if name in used:
+                continue
+            try:
+                with self.connection:
+                    self.connection.execute(f"DROP TABLE IF EXISTS {name}")
+                    self.connection.execute("DELETE FROM versions WHERE name = ?", (name,))
+            except sqlite3.OperationalError:  # queries are running, drop it with the next version
+                pass
+
+    def __reduce__(self):
+        # Connections cannot be pickled, so a copy reopens the database
+        return SQLStore, (self.database,)
+
+
+class ChatSQL(ChatAnalysis):  # stored as GenericChat.analyze, see Chat.set_analyze_backend
+    """Analyzes Chats inside an embedded SQLite database
+
+    Queries are parsed as by ChatAnalysis, then the plan
+    (operation, target, initial group, final groups) is translated
+    into SQL and executed by the database, so results match the
+    pandas backend without holding grouped frames in memory.
+
+    Messages are written to a table of the database, with indexes on
+    timestamp, channel and sender, the first time a query is run on
+    a version of the data (see SQLStore). A database written this way
+    can be reopened without a Chat, as ChatSQL(None, path), to query
+    the latest version stored without loading the messages.
+
+    :param parent: the Chat or ChatSnapshot to analyze, or None to query an existing database
+    :param database: path of the database file, ":memory:", or an SQLStore shared with other ChatSQLs
+    """
+
+    # SQL expression of each group; dates are ISO strings of the local date
+    group_columns = {
+        "message": "message",
+        "conversation": "conversation",
+        "day": "date(local_seconds, 'unixepoch')",
+        "week": "date(local_seconds, 'unixepoch', '-6 days', 'weekday 1')",
+        "month": "date(local_seconds, 'unixepoch', 'start of month')",
+        "year": "date(local_seconds, 'unixepoch', 'start of year')",
+        "sender": "sender",
+        "channel": "channel",
+    }
+    date_groups = {"day", "week", "month", "year"}
+
+    # SQL aggregate computing each target over a group of messages
+    target_columns = {
+        "message": "COUNT(*)",
+        "conversation": "COUNT(DISTINCT conversation)",
+        "word": "COALESCE(SUM(words), 0)",
+        "character": "COALESCE(SUM(LENGTH(content)), 0)",
+        "duration": "MAX(timestamp) - MIN(timestamp)",
+        "response": "AVG(response)",
+        "turn": "COALESCE(SUM(turn), 0)",
+    }
+
+    # SQL aggregate applying each operation to targets; mode is applied in pandas
+    operation_columns = {
+        "mean": "AVG(value)",
+        "median": "median(value)",
+        "range": "MAX(value) - MIN(value)",
+        "stdev": "stdev(value)",
+        "total": "SUM(value)",
+        "max": "MAX(value)",
+        "min": "MIN(value)",
+    }
+
+    def __init__(self, parent, database=":memory:"):
+        super().__init__(parent)
+        self._store = database if isinstance(database, SQLStore) else SQLStore(database)
+        self.database = self._store.database
+        self._connection = self._store.connection
+        self._table = None  # table of the version last queried
+        self._table_version = None
+
+    def store(self):
+        """Writes the parent's messages to the database, if their version is not stored yet
+
+        :return: self
+        """
+        version = self._version()
+        self._store.table(self, version)
+        self._table_version = version
+        return self
+
+    def close(self):
+        self._store.close()
+
+    ####################
+    # Internal methods #
+    ####################
+
+    @staticmethod
+    def _rows(messages, replies):
+        """Converts messages, and their turns and response times, to rows of a messages table"""
+        timestamps = messages["timestamp"].dt.as_unit("ns")
+        responses = replies["response"].dt.as_unit("ns")
+        return pd.DataFrame({
+            "message": messages.index,
+            "sender": messages["sender"].astype(object),
+            "timestamp": timestamps.array.asi8,
+            # Wall-clock time in the Chat's timezone, which date groups are taken in
+            "local_seconds": timestamps.dt.tz_localize(None).array.asi8 // 10**9,
+            "channel": messages["channel"].astype(object),
+            "conversation": messages["conversation"],
+            "source": messages["source"].astype(object),
+            "content": messages["content"].astype(object),
+            "words": messages["content"].str.split().str.len(),
+            "turn": replies["turn"].astype(int),
+            "response": pd.arrays.IntegerArray(responses.array.asi8, responses.isna().to_numpy()),
+        })
+
+    def _stage(self, name):
+        if self._parent is None:
+            return null_stage
+        return self._parent._stage(name)
+
+    def _version(self):
+        # Date groups depend on the timezone, which the hash does not cover
+        return f"{hash(self._parent)} {self._parent._timezone}"
+
+    def _current_table(self):
+        """Gets the table of the parent's current version, storing it if needed"""
+        if self._parent is None:
+            if self._table is None:
+                self._table = self._store.latest()
+            if self._table is None:
+                raise ValueError(f"No messages are stored in '{self.database}'")
+            return self._table
+        if self._table is None or self._table_version != self._version():
+            self.store()
+        return self._table
+
+    def _execute_ranked(self, ranking, op, target, igroup, fgroups):
+        # Groups are totalled in the database, so the N are selected from its result
+        if fgroups is None:
+            raise ValueError("Only queries with final groups can be ranked")
+        return self._select(self._execute_query(op, target, igroup, fgroups), *ranking)
+
+    def _execute_query(self, op, target, igroup, fgroups):
+        table = self._current_table()
+        with self._stage("execute") as execute_stage:
+            fgroups = fgroups or []
+            names = [f"g{i}" for i in range(len(fgroups))]
+            selected = [f"{self.group_columns[g]} AS {name}" for g, name in zip(fgroups, names)]
+            inner_groups = fgroups + ([igroup] if igroup is not None else [])
+            # Grouping drops missing keys, as pandas does
+            where = " AND ".join(f"{self.group_columns[g]} IS NOT NULL" for g in inner_groups) or "1"
+            grouped = ", ".join(self.group_columns[g] for g in inner_groups)
+            sql = (f"SELECT {', '.join(selected + [self.target_columns[target] + ' AS value'])} "
+                   f"FROM {table} WHERE {where}" + (f" GROUP BY {grouped}" if grouped else ""))
+
+            if igroup is not None and op not in self.operation_columns:
+                # Fetch one row per group and apply the operation in pandas
+                result = self._read(sql, fgroups, names)
+                if not fgroups:
+                    result = self._operate(self._to_target(result["value"].rename(None), target), op)
+                else:
+                    result = result.groupby(fgroups).apply(
+                        lambda x: self._operate(self._to_target(x["value"].rename(None), target), op))
+            elif igroup is not None:
+                outer = ", ".join(names)
+                sql = (f"SELECT {', '.join(names + [self.operation_columns[op] + ' AS value'])} FROM ({sql})"
+                       + (f" GROUP BY {outer} ORDER BY {outer}" if outer else ""))
+                result = self._read(sql, fgroups, names)
+                if not fgroups:
+                    result = self._to_target(result["value"], target).iloc[0]
+                else:
+                    result = self._to_target(result.set_index(fgroups)["value"], target).rename(None)
+            else:
+                sql += f" ORDER BY {', '.join(names)}"
+                result = self._read(sql, fgroups, names)
+                result = self._to_target(result.set_index(fgroups)["value"], target).rename(None)
+
+            execute_stage["rows"] = len(result.index) if isinstance(result, pd.Series) else 1
+        return result
+
+    def _read(self, sql, fgroups, names):
+        """Runs a query, naming group columns and converting dates"""
+        result = pd.read_sql_query(sql, self._connection).rename(columns=dict(zip(names, fgroups)))
+        for group in fgroups:
+            if group in self.date_groups:
+                result[group] = pd.to_datetime(result[group]).dt.date
+        return result
+
+    @staticmethod
+    def _to_target(values, target):
+        """Converts stored values to the type of the target"""
+        if target in ("duration", "response"):
+            return pd.to_timedelta(values.astype("float64").round(), unit="ns")
+        return values
+
+
+class _Median:
+    """SQLite aggregate matching pandas' median"""
+
+    def __init__(self):
+        self.values = []
+
+    def step(self, value):
+        if value is not None:
+            self.values.append(value)
+
+    def finalize(self):
+        return statistics.median(self.values) if self.values else None
+
+
+class _Stdev:
+    """SQLite aggregate matching pandas' std, the sample standard deviation"""
+
+    def __init__(self):
+        self.count, self.mean, self.squares = 0, 0.0, 0.0
+
+    def step(self, value):
+        if value is None:
+            return
+        # Welford's algorithm
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.squares += delta * (value - self.mean)
+
+    def finalize(self):
+        return math.sqrt(self.squares / (self.count - 1)) if self.count > 1 else None
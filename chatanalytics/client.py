@@ -0,0 +1,102 @@
+"""Client for the local query server, see server.py
+
+RemoteChat mirrors Chat.analyze, so code analyzing a Chat can query a
+server instead by swapping the Chat for ``client.connect(...)``.
+"""
+import itertools
+import socket
+import threading
+
+from . import protocol
+
+
+class ChatClient:
+    """A connection to a ChatServer
+
+    :param port: TCP port of a server on host
+    :param host: address of the server
+    :param path: Unix socket path, used instead of host and port if given
+    :param timeout: seconds to wait for a response, or None to wait forever
+    """
+
+    def __init__(self, port=8765, host="127.0.0.1", path=None, timeout=None):
+        if path is not None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(path)
+        else:
+            self._socket = socket.create_connection((host, port))
+        self._socket.settimeout(timeout)
+        self._file = self._socket.makefile("rb")
+        self._ids = itertools.count()
+        self._lock = threading.Lock()  # one request at a time per connection
+
+    def request(self, method, **params):
+        """Sends a request and waits for its response
+
+        :return: the response's result
+        :raises: the server's error, as itself if a builtin error, else RuntimeError
+        """
+        with self._lock:
+            request_id = next(self._ids)
+            self._socket.sendall(protocol.dumps({"id": request_id, "method": method, **params}))
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection")
+        response = protocol.loads(line)
+        if "error" in response:
+            error = response["error"]
+            raise protocol.errors.get(error["type"], RuntimeError)(error["message"])
+        return response["result"]
+
+    def chats(self):
+        """Gets the name, version and number of messages of each served Chat"""
+        return self.request("chats")
+
+    def analyze(self, query, chat=None):
+        return protocol.decode_result(self.request("analyze", query=query, chat=chat))
+
+    def graph_data(self, query, chat=None, max_points=None):
+        """Gets a result to graph and its labels
+
+        :return: (result, dict of title, x_groups and y_axis_name)
+        """
+        data = self.request("graph_data", query=query, chat=chat, max_points=max_points)
+        return protocol.decode_result(data["result"]), data["parsed"]
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class RemoteChat:
+    """A Chat served by a ChatServer, queried like a Chat
+
+    :param client: the ChatClient connected to the server
+    :param name: the served Chat's name, or None if the server has one Chat
+    """
+
+    def __init__(self, client, name=None):
+        self.client = client
+        self.name = name
+
+    def analyze(self, query):
+        return self.client.analyze(query, chat=self.name)
+
+    def graph_data(self, query, max_points=None):
+        return self.client.graph_data(query, chat=self.name, max_points=max_points)
+
+
+def connect(chat=None, port=8765, host="127.0.0.1", path=None, timeout=None):
+    """Connects to a served Chat
+
+    :param chat: the served Chat's name, or None if the server has one Chat
+    :return: RemoteChat
+    """
+    return RemoteChat(ChatClient(port, host, path, timeout), chat)
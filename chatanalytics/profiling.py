@@ -0,0 +1,110 @@
+import time
+import tracemalloc
+
+import pandas as pd
+
+
+class StageProfiler:
+    """Records wall time, row counts and memory growth of named stages
+
+    Used through Chat.profile, which passes it to Chat and ChatAnalysis
+    for the duration of a with block. Stages may be nested; a stage's
+    record is added when it finishes, so inner stages come first.
+
+    :param sink: callable given each record (a dict) as its stage finishes
+    :param memory: whether to trace memory growth with tracemalloc
+    """
+
+    def __init__(self, sink=None, memory=True):
+        self.records = []
+        self.sink = sink
+        self.memory = memory
+        self._depth = 0
+        self._started_tracing = False
+        self._start = time.perf_counter()
+
+    def start(self):
+        """Starts memory tracing, if enabled and not already running"""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def stop(self):
+        """Stops memory tracing, if it was started by this profiler"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return self
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def report(self):
+        """Gets every record as a DataFrame
+
+        :return: DataFrame with stage, depth, start, seconds, rows and memory columns
+        """
+        report = pd.DataFrame(self.records, columns=["stage", "depth", "start", "seconds", "rows", "memory"])
+        return report.astype({"rows": "Int64", "memory": "Int64"})
+
+    def summary(self):
+        """Gets total time, calls and memory growth per stage
+
+        :return: DataFrame indexed by stage, slowest first
+        """
+        return self.report().groupby("stage").agg(
+            calls=("seconds", "size"),
+            seconds=("seconds", "sum"),
+            rows=("rows", "sum"),
+            memory=("memory", "sum"),
+        ).sort_values("seconds", ascending=False)
+
+    def _finish(self, record):
+        self.records.append(record)
+        if self.sink is not None:
+            self.sink(record)
+
+
+class _Stage:
+    """A running stage; code being profiled may set record["rows"]"""
+
+    __slots__ = ("_profiler", "record", "_start", "_memory")
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self.record = {"stage": name, "depth": profiler._depth, "start": None,
+                       "seconds": None, "rows": None, "memory": None}
+
+    def __enter__(self):
+        self._profiler._depth += 1
+        self._memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        self._start = time.perf_counter()
+        self.record["start"] = self._start - self._profiler._start
+        return self.record
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.record["seconds"] = time.perf_counter() - self._start
+        if self._memory is not None and tracemalloc.is_tracing():
+            self.record["memory"] = tracemalloc.get_traced_memory()[0] - self._memory
+        self._profiler._depth -= 1
+        self._profiler._finish(self.record)
+        return False
+
+
+class _NullStage:
+    """Stage used when profiling is disabled"""
+
+    __slots__ = ("record",)
+
+    def __init__(self):
+        self.record = {}
+
+    def __enter__(self):
+        return self.record
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+null_stage = _NullStage()
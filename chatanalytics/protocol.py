@@ -0,0 +1,100 @@
+"""Messages between the query server and its clients
+
+Requests and responses are JSON objects, one per line. A request is
+``{"id": ..., "method": ..., **params}`` and its response is either
+``{"id": ..., "result": ...}`` or ``{"id": ..., "error": {"type": ..., "message": ...}}``.
+
+Analysis results are encoded by encode_result, keeping index names,
+multi-level indexes, dates and timedeltas, so decode_result gives back
+what Chat.analyze would have returned.
+"""
+import datetime
+import json
+
+import numpy as np
+import pandas as pd
+
+# Errors raised again as themselves by clients; others become RuntimeError
+errors = {error.__name__: error for error in (ValueError, KeyError, TypeError, FileNotFoundError, MemoryError)}
+
+
+def dumps(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def loads(line):
+    return json.loads(line)
+
+
+def encode_result(result):
+    """Encodes a Series or scalar analysis result as JSON-compatible data"""
+    if isinstance(result, pd.Series):
+        if isinstance(result.dtype, np.dtype) and result.dtype.kind == "m":
+            # Timedeltas as nanoseconds, missing as null
+            nanoseconds = result.dt.as_unit("ns").array.asi8
+            values = [None if isna else int(v) for v, isna in zip(nanoseconds, result.isna().to_numpy())]
+        else:
+            values = [encode_value(v) for v in result.to_numpy()]
+        return {
+            "type": "series",
+            "name": encode_value(result.name),
+            "dtype": str(result.dtype),
+            "names": list(result.index.names),
+            "index": [[encode_value(v) for v in key] if isinstance(key, tuple) else encode_value(key)
+                      for key in result.index],
+            "values": values,
+        }
+    return {"type": "scalar", "value": encode_value(result)}
+
+
+def decode_result(data):
+    """Decodes a result encoded by encode_result"""
+    if data["type"] == "scalar":
+        return decode_value(data["value"])
+
+    keys = [tuple(decode_value(v) for v in key) if isinstance(key, list) else decode_value(key)
+            for key in data["index"]]
+    if len(data["names"]) > 1:
+        index = pd.MultiIndex.from_tuples(keys, names=data["names"]) if keys \
+            else pd.MultiIndex.from_arrays([[]] * len(data["names"]), names=data["names"])
+    else:
+        index = pd.Index(keys, name=data["names"][0], dtype=None if keys else object)
+
+    dtype = data["dtype"]
+    if dtype.startswith("timedelta64"):
+        values = pd.to_timedelta(pd.array(data["values"], dtype="Int64"), unit="ns").astype(dtype)
+        return pd.Series(values, index=index, name=decode_value(data["name"]))
+    values = [decode_value(v) for v in data["values"]]
+    try:
+        return pd.Series(values, index=index, name=decode_value(data["name"]), dtype=dtype)
+    except (TypeError, ValueError):
+        return pd.Series(values, index=index, name=decode_value(data["name"]))
+
+
+def encode_value(value):
+    """Encodes one value, tagging types JSON lacks"""
+    if value is pd.NaT:
+        return {"$nat": None}
+    if isinstance(value, pd.Timestamp):
+        return {"$timestamp": value.isoformat()}
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return {"$date": value.isoformat()} if type(value) is datetime.date \
+            else {"$timestamp": pd.Timestamp(value).isoformat()}
+    if isinstance(value, (pd.Timedelta, datetime.timedelta)):
+        return {"$timedelta": pd.Timedelta(value).as_unit("ns").value}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def decode_value(value):
+    if isinstance(value, dict):
+        if "$timestamp" in value:
+            return pd.Timestamp(value["$timestamp"])
+        if "$date" in value:
+            return datetime.date.fromisoformat(value["$date"])
+        if "$timedelta" in value:
+            return pd.Timedelta(value["$timedelta"], unit="ns")
+        if "$nat" in value:
+            return pd.NaT
+    return value
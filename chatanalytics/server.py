@@ -0,0 +1,208 @@
+"""Local query server keeping processed Chats in memory
+
+Loads and processes a set of Chats once, then answers analyze and
+graph data requests from other processes over a localhost TCP port or
+a Unix socket (see protocol.py for the messages and client.py for the
+client). Queries run on Chat snapshots in a thread pool, and results
+are cached per Chat version.
+
+Run from the base directory with, for example,
+``python -m chatanalytics.server --chat messenger=export/messages/inbox --port 8765``
+"""
+import argparse
+import asyncio
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import protocol
+from .chats import Chat
+
+
+class ChatServer:
+    """Answers requests about Chats over a local socket
+
+    :param chats: dict of name -> Chat to serve
+    :param cache_size: number of encoded results to keep
+    :param workers: number of threads to run queries in
+    """
+
+    def __init__(self, chats, cache_size=256, workers=None):
+        self.chats = dict(chats)
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = collections.OrderedDict()  # (name, version, method, params) -> encoded result
+        self._cache_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers)
+        self._server = None
+
+        self.methods = {
+            "ping": self._method_ping,
+            "chats": self._method_chats,
+            "analyze": self._method_analyze,
+            "graph_data": self._method_graph_data,
+        }
+
+    async def start(self, host="127.0.0.1", port=0, path=None):
+        """Processes every Chat and starts listening
+
+        :param host: address to listen on, localhost by default
+        :param port: TCP port, or 0 for any free port
+        :param path: Unix socket path, used instead of host and port if given
+        :return: the address listened on, (host, port) or path
+        """
+        loop = asyncio.get_running_loop()
+        for chat in self.chats.values():
+            await loop.run_in_executor(self._executor, chat.snapshot)
+
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path)
+            return path
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self._executor.shutdown(wait=False)
+
+    ####################
+    # Internal methods #
+    ####################
+
+    async def _handle_connection(self, reader, writer):
+        lock = asyncio.Lock()  # responses to concurrent requests are written one at a time
+
+        async def respond(request):
+            response = await self._respond(request)
+            async with lock:
+                writer.write(protocol.dumps(response))
+                await writer.drain()
+
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, line):
+        request_id = None
+        try:
+            request = protocol.loads(line)
+            request_id = request.get("id")
+            method = self.methods[request["method"]]
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, method, request)
+            return {"id": request_id, "result": result}
+        except Exception as e:  # noqa, sent to the client
+            return {"id": request_id, "error": {"type": type(e).__name__, "message": str(e)}}
+
+    def _chat(self, request):
+        name = request.get("chat")
+        if name is None and len(self.chats) == 1:
+            name = next(iter(self.chats))
+        if name not in self.chats:
+            raise KeyError(f"Chat '{name}' is not served")
+        return name, self.chats[name]
+
+    def _cached(self, key, compute):
+        with self._cache_lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = compute()
+        with self._cache_lock:
+            self.misses += 1
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _method_ping(self, request):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _method_chats(self, request):
+        snapshots = {name: chat.snapshot(latest=False) for name, chat in self.chats.items()}
+        return {name: {"version": snapshot.version, "messages": len(snapshot.messages.index)}
+                for name, snapshot in snapshots.items()}
+
+    def _method_analyze(self, request):
+        name, chat = self._chat(request)
+        snapshot = chat.snapshot(latest=False)
+        query = request["query"]
+        return self._cached((name, snapshot.version, "analyze", query),
+                            lambda: protocol.encode_result(snapshot.analyze(query)))
+
+    def _method_graph_data(self, request):
+        """Gets a result to graph, with its axis labels, see ChatGraph"""
+        name, chat = self._chat(request)
+        snapshot = chat.snapshot(latest=False)
+        query, max_points = request["query"], request.get("max_points")
+
+        def compute():
+            parsed = chat.graph._parse_query(query)
+            result = snapshot.analyze(query)
+            if max_points and result.index.nlevels == 1:
+                result = chat.graph._downsample(result, max_points)
+            return {"parsed": parsed, "result": protocol.encode_result(result)}
+        return self._cached((name, snapshot.version, "graph_data", query, max_points), compute)
+
+
+def serve(chats, host="127.0.0.1", port=0, path=None, cache_size=256, workers=None):
+    """Serves Chats until interrupted
+
+    :param chats: dict of name -> Chat to serve
+    :return: None
+    """
+    async def run():
+        server = ChatServer(chats, cache_size, workers)
+        address = await server.start(host, port, path)
+        print(f"Serving {', '.join(chats)} on {address}", flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chat", action="append", required=True, metavar="NAME=PATH",
+                        help="a Chat to serve, batch loaded from PATH (a file, directory or zip archive)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", default=None, help="Unix socket path to listen on instead of a port")
+    parser.add_argument("--timezone", default=None)
+    parser.add_argument("--rollup", action="store_true", help="keep rollup cubes, see Chat.set_rollup")
+    parser.add_argument("--cache-size", type=int, default=256)
+    parser.add_argument("--watch", type=float, default=None, metavar="SECONDS",
+                        help="refresh each Chat from its PATH this often, see Chat.refresh")
+    args = parser.parse_args()
+
+    chats = {}
+    for spec in args.chat:
+        name, _, path = spec.partition("=")
+        chats[name] = Chat().set_timezone(args.timezone).set_rollup(args.rollup)
+        chats[name].batch_load(path, do_walk=True)
+        if args.watch is not None:
+            threading.Thread(target=chats[name].watch, args=(path, True, args.watch), daemon=True).start()
+    serve(chats, args.host, args.port, args.socket, args.cache_size)
+
+
+if __name__ == "__main__":
+    main()
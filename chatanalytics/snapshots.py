@@ -0,0 +1,94 @@
+import threading
+
+from . import utils
+
+
+class ChatSnapshot:
+    """An immutable, versioned view of a Chat's processed messages
+
+    Made by Chat.snapshot. A snapshot shares its columns with the Chat
+    rather than copying them; the Chat only ever replaces its frames
+    or writes to them with copy-on-write, so a snapshot never changes
+    after it is made, whatever the Chat loads afterwards. Snapshots
+    can therefore be queried from many threads at once, without locks
+    and without waiting on the Chat.
+
+    Frames given out by a snapshot must not be modified.
+
+    :param chat: the processed Chat to take a view of
+    :param version: the Chat's version, which increases whenever its data changes
+    """
+
+    __slots__ = ("version", "_messages", "_conversations", "_rollup", "_replies", "_timezone", "_stage",
+                 "_rollup_keys", "_rollup_calendar", "_rollup_targets", "_backend_factory", "_analyze_backend",
+                 "_hash", "_lock")
+
+    def __init__(self, chat, version):
+        self.version = version
+        # Shallow copies share columns, and are not affected by later writes to the Chat's frames
+        self._messages = chat._messages.copy(deep=False)
+        self._conversations = chat._conversations.copy(deep=False)
+        self._rollup = None if chat._rollup is None else chat._rollup.copy(deep=False)
+        self._replies = None if chat._replies is None else chat._replies.copy(deep=False)
+        self._timezone = chat._timezone
+        self._stage = chat._stage  # profiling stays with the Chat
+        self._rollup_keys = chat._rollup_keys
+        self._rollup_calendar = chat._rollup_calendar
+        self._rollup_targets = chat._rollup_targets
+        self._backend_factory = chat._analyze_backend_factory
+        self._analyze_backend = None
+        self._hash = None
+        self._lock = threading.Lock()
+
+    #############
+    # Accessors #
+    #############
+
+    @property
+    def messages(self):
+        return self._messages
+
+    @property
+    def conversations(self):
+        return self._conversations
+
+    @property
+    def rollup(self):
+        return self._rollup
+
+    @property
+    def replies(self):
+        if self._replies is None:
+            # Racing threads compute the same frame, so either may win
+            self._replies = utils.find_replies(self._messages)
+        return self._replies
+
+    #######################
+    # Public data methods #
+    #######################
+
+    def analyze(self, query):
+        if self._analyze_backend is None:
+            with self._lock:
+                if self._analyze_backend is None:
+                    self._analyze_backend = self._new_analyze_backend()
+        return self._analyze_backend.analyze(query)
+
+    ######################
+    # Internal Functions #
+    ######################
+
+    def _new_analyze_backend(self):
+        if self._backend_factory is None:
+            from .chatanalysis import ChatAnalysis
+            return ChatAnalysis(self)
+        return self._backend_factory(self)
+
+    #####################
+    # Special Functions #
+    #####################
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = utils.hash_frames(self._messages, self._conversations)
+        return self._hash
@@ -0,0 +1,133 @@
+"""File access for loaders, covering directories and zip archives
+
+A zip archive is treated as a directory. Paths inside it are written
+as the archive's path followed by the member's path, for example
+``export.zip/messages/c123/channel.json``. Members are found through
+the archive's central directory and read without being extracted.
+"""
+import functools
+import hashlib
+import io
+import os
+import time
+import zipfile
+
+
+class _Archive:
+    """An open zip archive with its directory tree"""
+
+    def __init__(self, path):
+        self.zipfile = zipfile.ZipFile(path)
+        self.files = {}  # member path -> ZipInfo
+        self.directories = {"": ([], [])}  # directory path -> (subdirectory names, file names)
+
+        for info in self.zipfile.infolist():
+            parts = info.filename.rstrip("/").split("/")
+            depth = len(parts) if info.is_dir() else len(parts) - 1
+            for i in range(depth):
+                directory = "/".join(parts[:i + 1])
+                if directory not in self.directories:
+                    self.directories[directory] = ([], [])
+                    self.directories["/".join(parts[:i])][0].append(parts[i])
+            if not info.is_dir():
+                self.files["/".join(parts)] = info
+                self.directories["/".join(parts[:-1])][1].append(parts[-1])
+
+
+@functools.lru_cache(maxsize=8)
+def _open_archive(path, mtime, size):
+    # mtime and size are part of the key so changed archives are reopened
+    return _Archive(path)
+
+
+def _archive(path):
+    stat = os.stat(path)
+    return _open_archive(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def split(path):
+    """Splits a path into its zip archive and member
+
+    :param path: a filesystem path, possibly into a .zip archive
+    :return: (archive path, member path), or (None, path) outside archives
+    """
+    parts = os.path.normpath(path).split(os.sep)
+    for i in range(1, len(parts) + 1):
+        prefix = os.sep.join(parts[:i])
+        if prefix.lower().endswith(".zip") and os.path.isfile(prefix):
+            return prefix, "/".join(parts[i:])
+    return None, path
+
+
+def isfile(path):
+    archive, member = split(path)
+    if archive is None:
+        return os.path.isfile(path)
+    return member in _archive(archive).files
+
+
+def isdir(path):
+    archive, member = split(path)
+    if archive is None:
+        return os.path.isdir(path)
+    return member in _archive(archive).directories
+
+
+def listdir(path):
+    archive, member = split(path)
+    if archive is None:
+        return os.listdir(path)
+    subdirectories, files = _archive(archive).directories[member]
+    return subdirectories + files
+
+
+def getsize(path):
+    archive, member = split(path)
+    if archive is None:
+        return os.path.getsize(path)
+    return _archive(archive).files[member].file_size
+
+
+def getmtime(path):
+    """Modification time of a file, or of an archive member as stored in the archive"""
+    archive, member = split(path)
+    if archive is None:
+        return os.path.getmtime(path)
+    return time.mktime(_archive(archive).files[member].date_time + (0, 0, -1))
+
+
+def digest(path, chunk_size=1 << 20):
+    """SHA-256 of the contents of a file or archive member, as hex"""
+    archive, member = split(path)
+    sha256 = hashlib.sha256()
+    with open(path, "rb") if archive is None else _archive(archive).zipfile.open(member) as file:
+        while chunk := file.read(chunk_size):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def open_text(path, encoding='utf-8'):
+    """Opens a file, or an archive member, for reading text"""
+    archive, member = split(path)
+    if archive is None:
+        return open(path, "r", encoding=encoding)
+    return io.TextIOWrapper(_archive(archive).zipfile.open(member), encoding=encoding)
+
+
+def walk(path):
+    """Walks a directory or archive top-down, like os.walk
+
+    :return: iterator of (directory path, subdirectory names, file names)
+    """
+    archive, member = split(path)
+    if archive is None:
+        yield from os.walk(path)
+        return
+
+    directories = _archive(archive).directories
+    pending = [member]
+    while pending:
+        directory = pending.pop(0)
+        subdirectories, files = directories[directory]
+        yield (archive + "/" + directory).rstrip("/"), list(subdirectories), list(files)
+        pending += [f"{directory}/{name}".lstrip("/") for name in subdirectories]
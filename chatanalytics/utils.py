@@ -1,6 +1,9 @@
 import datetime
 
+import numpy as np
+import pandas as pd
 from dateutil.relativedelta import MO, relativedelta
+from pandas.util import hash_pandas_object
 
 epoch = datetime.date(1970, 1, 1)
 
@@ -71,3 +74,72 @@ def get_year_of_messages(messages):
 def get_day_number(dt):
     """Gets days since the epoch 1/1/1970"""
     return (dt - epoch).days
+
+
+def decode_latin1_escapes(strings):
+    """Decodes text that Messenger wrote as UTF-8 bytes in latin-1 escapes
+
+    Messenger exports "é" as "\\u00c3\\u00a9", so loaded text reads "Ã©".
+    The whole Series is joined, re-encoded and decoded at once, falling
+    back to one string at a time if any string cannot be decoded.
+
+    :param strings: Series of str
+    :return: Series of decoded str
+    """
+    values = strings.tolist()
+    joined = "\x00".join(values)
+    if joined.isascii():
+        return strings
+
+    try:
+        decoded = joined.encode("latin-1").decode("utf-8").split("\x00")
+    except UnicodeError:
+        decoded = None
+    if decoded is None or len(decoded) != len(values):
+        decoded = [decode_latin1_escape(value) for value in values]
+    return pd.Series(decoded, index=strings.index, name=strings.name)
+
+
+def decode_latin1_escape(value):
+    """Decodes one string, see decode_latin1_escapes"""
+    try:
+        return value.encode("latin-1").decode("utf-8")
+    except UnicodeError:
+        return value
+
+
+def find_replies(messages):
+    """Finds turns and response times of processed messages
+
+    A message takes a turn when its sender differs from that of the
+    previous message in its channel, sent at most an hour before, and
+    its response time is the time since that message. Messages are
+    stably ordered by (channel, timestamp), so one pass of shifted
+    sender and timestamp arrays covers every channel, however their
+    messages interleave in time.
+
+    :param messages: processed messages
+    :return: DataFrame with turn and response columns, on the messages' index
+    """
+    channels = pd.factorize(messages.channel)[0]
+    order = np.lexsort((messages.timestamp.array.asi8, channels))
+    channels = pd.Series(channels[order])
+    senders = messages.sender.iloc[order].reset_index(drop=True)
+    gaps = messages.timestamp.iloc[order].reset_index(drop=True).diff()
+
+    same_run = channels.eq(channels.shift()) & gaps.le(pd.Timedelta(hours=1))
+    turn = same_run & senders.ne(senders.shift())
+    replies = pd.DataFrame({"turn": turn, "response": gaps.where(turn)})
+    # Back to the messages' order
+    positions = np.empty_like(order)
+    positions[order] = np.arange(len(order))
+    return replies.take(positions).set_axis(messages.index)
+
+
+def hash_frames(*frames):
+    """Hashes the contents of DataFrames, including their indexes
+
+    :return: int in [0, 2**64)
+    """
+    # Sum as uint64 arrays (wrapping), then as Python ints so hash() accepts the result
+    return sum(int(hash_pandas_object(frame, index=True).to_numpy().sum()) for frame in frames) % 2**64
@@ -1 +1,15 @@
-from .test_chats import DiscordChatTest, MessengerChatTest
+from .test_autocorrect import AutocorrectTest
+from .test_chats import DiscordChatTest, MessengerChatTest, MessengerThreadTest, PostProcessTest
+from .test_imports import ImportTest
+from .test_chatgraph import ChatGraphTest
+from .test_synthetic import SyntheticExportTest
+from .test_profiling import ProfilingTest
+from .test_memory import MemoryBudgetTest
+from .test_sources import ZipSourceTest
+from .test_utils import UtilsTest
+from .test_chatsql import ChatSQLTest
+from .test_rollup import RollupTest
+from .test_chatanalysis import RankingTest, ReplyTest
+from .test_snapshots import SnapshotTest
+from .test_server import ServerTest
+from .test_manifest import ManifestTest
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import chatanalytics  # to be run in base directory
+from chatanalytics import autocorrect
+from chatanalytics.chatanalysis import ChatAnalysis
+from .utils_for_test_cases import write_discord_channel
+
+
+class AutocorrectTest(unittest.TestCase):
+
+    def test_distance(self):
+        self.assertEqual(autocorrect.damerau_levenshtein_distance("word", "word"), 0)
+        self.assertEqual(autocorrect.damerau_levenshtein_distance("wrod", "word"), 1)
+        self.assertEqual(autocorrect.damerau_levenshtein_distance("wrd", "word"), 1)
+        self.assertEqual(autocorrect.damerau_levenshtein_distance("kitten", "sitting"), 3)
+        self.assertEqual(autocorrect.damerau_levenshtein_distance("", "day"), 3)
+
+    def test_distance_limit(self):
+        self.assertEqual(autocorrect.damerau_levenshtein_distance("kitten", "sitting", limit=1), 2)
+        self.assertEqual(autocorrect.damerau_levenshtein_distance("kitten", "sitting", limit=3), 3)
+        self.assertEqual(autocorrect.damerau_levenshtein_distance("day", "conversation", limit=2), 3)
+
+    def test_correct_word(self):
+        self.assertEqual(autocorrect.correct_word("messages"), (0, "messages"))
+        self.assertEqual(autocorrect.correct_word("mesages"), (1, "messages"))
+        self.assertEqual(autocorrect.correct_word("xyzzyq"), (0, "xyzzyq"))
+
+    def test_correct_first_letter(self):
+        self.assertEqual(autocorrect.correct_word("nessages"), (1, "messages"))
+        self.assertEqual(autocorrect.correct_word("dhannel"), (1, "channel"))
+
+    def test_query_words_unchanged(self):
+        query = "max of msgs per wk sorted by chat and sender"
+        self.assertEqual(autocorrect.correct_passage(query), (0, query))
+
+    def test_query_vocabulary_unchanged(self):
+        analysis = ChatAnalysis(None)
+        for words in (analysis.ops, analysis.op_subs, analysis.targets, analysis.target_subs,
+                      analysis.groups, analysis.group_subs):
+            for word in words:
+                with self.subTest(word=word):
+                    self.assertEqual(autocorrect.correct_passage(word), (0, word))
+
+    def test_correct_passage(self):
+        self.assertEqual(autocorrect.correct_passage("avrage wrods per dya"),
+                         (3, "average words per day"))
+
+    def test_concurrent_first_use(self):
+        index = autocorrect.query_index
+        self.addCleanup(setattr, autocorrect, "query_index", index)
+        autocorrect.query_index = None
+        barrier = threading.Barrier(8)
+        results = []
+
+        def correct():
+            barrier.wait()
+            results.append(autocorrect.correct_passage("mean of messages per dya by channel"))
+
+        with mock.patch.object(autocorrect, "open", create=True, side_effect=open) as opened:
+            threads = [threading.Thread(target=correct) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(results, [(1, "mean of messages per day by channel")] * 8)
+
+    def test_digits_unchanged(self):
+        self.assertEqual(autocorrect.correct_word("10"), (0, "10"))
+        self.assertEqual(autocorrect.correct_word("2nd"), (0, "2nd"))
+
+    def test_correct_tokens_memo(self):
+        vocabulary = autocorrect.Vocabulary(["messages", "tonight"])
+        memo = autocorrect.correct_tokens(["mesages", "tonigth", "mesages"], vocabulary)
+        self.assertEqual(memo, {"mesages": (1, "messages"), "tonigth": (1, "tonight")})
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "memo.json")
+            fingerprint = autocorrect.memo_fingerprint(vocabulary)
+            autocorrect.save_memo(memo, path, fingerprint)
+            self.assertEqual(autocorrect.load_memo(path, fingerprint), memo)
+            self.assertEqual(autocorrect.load_memo(os.path.join(directory, "missing.json"), fingerprint), {})
+            # Memos made with another vocabulary or other counts are discarded
+            other = autocorrect.memo_fingerprint(autocorrect.Vocabulary(["messages"]))
+            self.assertEqual(autocorrect.load_memo(path, other), {})
+            self.assertEqual(autocorrect.load_memo(path, autocorrect.memo_fingerprint(vocabulary, {"mesages": 1})),
+                             {})
+
+    def test_normalize_memo_of_other_corpus(self):
+        with tempfile.TemporaryDirectory() as directory:
+            memo_path = os.path.join(directory, "memo.json")
+
+            def normalize(channel_id, contents):
+                timestamps = [f"2022-01-01 12:{i:02}:00+00:00" for i in range(len(contents))]
+                chat = chatanalytics.Chat().load(write_discord_channel(directory, channel_id, timestamps, contents))
+                return chat.normalize(memo_path=memo_path).normalized_content.tolist()
+
+            # "tomorow" is a rare typo of "tomorrow" in one corpus, and a word of its own in the other
+            self.assertEqual(normalize(1, ["see you tomorrow"] * 10 + ["see you tomorow"])[-1], "see you tomorrow")
+            self.assertEqual(normalize(2, ["see you tomorow"] * 10 + ["see you tomorrow"])[0], "see you tomorow")
+
+    def test_content_not_corrected_as_query(self):
+        vocabulary = autocorrect.Vocabulary(["the", "chat", "max", "sender"])
+        for word in ["my", "so", "to", "do", "me", "the", "cat", "may", "server"]:
+            with self.subTest(word=word):
+                self.assertEqual(vocabulary.correct(word), (0, word))
+
+    def test_content_ambiguous_unchanged(self):
+        # Both candidates are one edit away and equally common
+        self.assertEqual(autocorrect.Vocabulary(["bread", "break"]).correct("breal"), (0, "breal"))
+        self.assertEqual(autocorrect.Vocabulary({"bread": 10, "break": 1}).correct("breal"), (1, "bread"))
+        # Corrections must be more common than the word itself
+        self.assertEqual(autocorrect.Vocabulary({"bread": 10}).correct("breal", count=5), (0, "breal"))
+        counts = {"tomorrow": 6, "tomorow": 1}
+        self.assertEqual(autocorrect.content_vocabulary(counts).correct("tomorow", count=1), (1, "tomorrow"))
+
+    def test_normalize_chat(self):
+        chat = chatanalytics.Chat()
+        chat.load("test/test_data/messenger/messages/inbox/directmessage_78o3u1q7/message_1.json")
+        self.assertEqual(chat.normalized_content.tolist(), chat.messages["content"].tolist())
+
+    def test_normalize_sentences(self):
+        sentences = [
+            "Are we still meeting tomorrow? I'll bring the snacks.",
+            "Yes! See you tomorrow at the library, around 5pm.",
+            "Sounds good -- don't forget the projector cable.",
+            "I think the meeting is tomorow, see you there!",
+            "My cat says hi :) The library closes at 9, so be quick.",
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_discord_channel(directory, 1234567890, [f"2022-01-0{i + 1} 12:00:00+00:00"
+                                                                 for i in range(len(sentences))], sentences)
+            chat = chatanalytics.Chat().load(path)
+
+            expected = sentences[:3] + ["I think the meeting is tomorrow, see you there!"] + sentences[4:]
+            self.assertEqual(chat.normalize(vocabulary=["tomorrow"]).normalized_content.tolist(), expected)
+            # Without a vocabulary, only the messages' own frequent words are used
+            self.assertEqual(chat.normalize().normalized_content.tolist(), sentences)
+
+            word_list = os.path.join(directory, "words.txt")
+            with open(word_list, "w", encoding='utf-8') as file:
+                file.write("tomorrow 100\nlibrary\n")
+            self.assertEqual(chat.normalize(vocabulary=word_list).normalized_content.tolist(), expected)
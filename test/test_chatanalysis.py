@@ -0,0 +1,112 @@
+import unittest
+
+import pandas as pd
+
+import chatanalytics  # to be run in base directory
+from .utils_for_test_cases import write_synthetic_exports
+
+
+class RankingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory, _, _ = write_synthetic_exports(cls, messenger=dict(messages=3000, threads=4),
+                                                      discord=dict(messages=2000, channels=4))
+
+    def setUp(self):
+        self.chat = chatanalytics.Chat().set_timezone("Asia/Tokyo").batch_load(self.directory, do_walk=True)
+
+    def assertRanked(self, query, full_query, n, largest):
+        full = self.chat.analyze(full_query)
+
+        def head(series):
+            return series.sort_values(ascending=not largest, kind="stable").head(n)
+        if full.index.nlevels == 1:
+            expected = head(full)
+        else:
+            expected = full.groupby(level=list(range(full.index.nlevels - 1)), group_keys=False).apply(head)
+        pd.testing.assert_series_equal(self.chat.analyze(query), expected, check_dtype=False)
+
+    def test_top(self):
+        self.assertRanked("top 3 messages per sender", "messages per sender", 3, True)
+        self.assertRanked("top 10 senders by messages", "messages per sender", 10, True)
+
+    def test_bottom(self):
+        self.assertRanked("bottom 5 characters per conversation", "characters per conversation", 5, False)
+
+    def test_per_outer_group(self):
+        self.assertRanked("top 2 channels by words per month", "words per month by channel", 2, True)
+        self.assertRanked("bottom 1 messages per year by sender", "messages per year by sender", 1, False)
+
+    def test_operations(self):
+        self.assertRanked("top 2 mean of messages per day by channel", "mean of messages per day by channel", 2, True)
+        self.assertRanked("top 4 duration per conversation", "duration per conversation", 4, True)
+
+    def test_selected_from_totals(self):
+        self.assertRanked("top 3 words per conversation", "words per conversation", 3, True)
+        with self.chat.profile() as profiler:
+            self.chat.analyze("top 3 words per conversation")
+        stages = profiler.report()["stage"]
+        self.assertEqual((stages == "target").sum(), 1)
+        self.assertNotIn("prune", set(stages))
+
+    def test_backends(self):
+        expected = self.chat.analyze("top 3 channels by words per month")
+        self.chat.set_rollup()
+        pd.testing.assert_series_equal(self.chat.analyze("top 3 channels by words per month"), expected,
+                                       check_dtype=False)
+        self.chat.set_analyze_backend("sql")
+        pd.testing.assert_series_equal(self.chat.analyze("top 3 channels by words per month"), expected,
+                                       check_dtype=False, check_index_type=False)
+
+    def test_ungrouped(self):
+        self.assertRaises(ValueError, self.chat.analyze, "top 3 mean of messages per day")
+
+
+class ReplyTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Threads active over the same two days, so their messages interleave
+        cls.directory, _, _ = write_synthetic_exports(cls, messenger=dict(messages=3000, threads=4,
+                                                                          start="2022-01-01", end="2022-01-03"))
+
+    def setUp(self):
+        self.chat = chatanalytics.Chat().set_timezone("Asia/Tokyo").batch_load(self.directory, do_walk=True)
+
+    def test_replies(self):
+        # Compare against walking each channel in timestamp order
+        messages = self.chat.messages
+        turns = pd.Series(False, index=messages.index)
+        responses = pd.Series(pd.NaT, index=messages.index, dtype=messages.timestamp.dtype) - messages.timestamp
+        for _, channel in messages.groupby("channel", sort=False):
+            previous = None
+            for index, message in channel.sort_values("timestamp", kind="stable").iterrows():
+                if (previous is not None and message.timestamp - previous.timestamp <= pd.Timedelta(hours=1)
+                        and message.sender != previous.sender):
+                    turns[index] = True
+                    responses[index] = message.timestamp - previous.timestamp
+                previous = message
+        replies = self.chat.replies
+        self.assertTrue(turns.any())
+        pd.testing.assert_series_equal(replies["turn"], turns, check_names=False)
+        pd.testing.assert_series_equal(replies["response"], responses, check_names=False, check_dtype=False)
+
+    def test_targets(self):
+        replies = self.chat.messages.assign(**self.chat.replies)
+        pd.testing.assert_series_equal(self.chat.analyze("turns per sender"),
+                                       replies.groupby("sender")["turn"].sum().rename(None))
+        pd.testing.assert_series_equal(self.chat.analyze("response time per channel"),
+                                       replies.groupby("channel")["response"].mean().rename(None))
+        self.assertEqual(self.chat.analyze("max of turns per conversation"),
+                         replies.groupby("conversation")["turn"].sum().max())
+        with self.assertWarns(UserWarning):
+            self.assertEqual(self.chat.analyze("median of reply times per message"), replies["response"].median())
+
+    def test_sql(self):
+        sql = chatanalytics.Chat().set_timezone("Asia/Tokyo").batch_load(self.directory, do_walk=True)
+        sql.set_analyze_backend("sql")
+        for query in ["turns per sender", "mean of turns per conversation by channel"]:
+            pd.testing.assert_series_equal(self.chat.analyze(query), sql.analyze(query), check_dtype=False)
+        expected, result = self.chat.analyze("response time per channel"), sql.analyze("response time per channel")
+        self.assertLess((expected - result).abs().max(), pd.Timedelta(milliseconds=1))
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import chatanalytics  # to be run in base directory
+from chatanalytics.chatgraph import ChatGraph, largest_triangle_three_buckets
+from .utils_for_test_cases import write_discord_channel
+
+matplotlib.use("Agg")
+
+
+class ChatGraphTest(unittest.TestCase):
+    timezone = "UTC"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        days = pd.date_range("2020-01-01", periods=400, freq="D", tz="UTC")
+        timestamps, contents = [], []
+        for i, day in enumerate(days):
+            count = 40 if i == 123 else 1 + i % 3
+            timestamps += [str(day + pd.Timedelta(minutes=m)) for m in range(count)]
+            contents += ["message"] * count
+        cls.path = write_discord_channel(cls.directory.name, 5210286624850405, timestamps, contents)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.chat = chatanalytics.Chat()
+        self.chat.set_timezone(self.timezone)
+        self.chat.load(self.path)
+
+    def tearDown(self):
+        plt.close("all")
+
+    def test_lttb_keeps_ends_and_peaks(self):
+        y = np.ones(1000)
+        y[437] = 10
+        chosen = largest_triangle_three_buckets(np.arange(1000, dtype=float), y, 50)
+        self.assertEqual(len(chosen), 50)
+        self.assertEqual(chosen[0], 0)
+        self.assertEqual(chosen[-1], 999)
+        self.assertIn(437, chosen)
+
+    def test_lttb_short_series_unchanged(self):
+        chosen = largest_triangle_three_buckets(np.arange(10, dtype=float), np.ones(10), 50)
+        self.assertEqual(chosen.tolist(), list(range(10)))
+
+    def test_line_downsampled(self):
+        ax = self.chat.graph.line("messages per day", max_points=50)
+        y = ax.get_lines()[0].get_ydata()
+        self.assertEqual(len(y), 50)
+        self.assertEqual(max(y), 40)
+
+    def test_downsample_several_series(self):
+        index = pd.date_range("2020-01-01", periods=1000, freq="D")
+        for columns in (2, 5, 40):
+            with self.subTest(columns=columns):
+                data = pd.DataFrame(np.ones((1000, columns)), index=index)
+                data.iloc[437, 1] = 10
+                downsampled = ChatGraph._downsample(data, 50)
+                self.assertLessEqual(len(downsampled.index), 50)
+                self.assertEqual(downsampled[1].max(), 10)
+
+    def test_downsample_too_few_points(self):
+        series = pd.Series(np.arange(100, dtype=float))
+        for max_points in (1, 2):
+            with self.subTest(max_points=max_points):
+                self.assertRaises(ValueError, ChatGraph._downsample, series, max_points)
+        self.assertEqual(len(ChatGraph._downsample(series, 3).index), 3)
+        self.assertRaises(ValueError, self.chat.graph.line, "messages per day", max_points=2)
+
+    def test_decompose_title_case(self):
+        # Parsed groups are title-cased, see _parse_query
+        parsed = self.chat.graph._parse_query("words per month by sender")
+        self.assertEqual(self.chat.graph._decompose(parsed["x_groups"]), ["Month", "Sender"])
+
+    def test_line_default_not_downsampled(self):
+        ax = self.chat.graph.line("messages per day")
+        self.assertEqual(len(ax.get_lines()[0].get_ydata()), 400)
+
+    def test_max_points_attribute(self):
+        self.chat.graph.max_points = 100
+        ax = self.chat.graph.area("messages per day")
+        self.assertLessEqual(len(ax.get_lines()[0].get_ydata()), 100)
+
+    def test_render_batch(self):
+        specs = [
+            {"kind": "line", "query": "messages per day", "max_points": 50},
+            {"kind": "hist", "query": "messages per day", "filename": "histogram.png"},
+            ("bar", "words per month"),
+        ]
+        with tempfile.TemporaryDirectory() as out_dir:
+            report = self.chat.graph.render_batch(specs, out_dir, workers=2)
+            self.assertEqual(report["kind"].tolist(), ["line", "hist", "bar"])
+            self.assertEqual(os.path.basename(report["path"][1]), "histogram.png")
+            self.assertEqual(os.path.basename(report["path"][2]), "bar_words_per_month.png")
+            for path in report["path"]:
+                self.assertTrue(os.path.isfile(path))
+            # Both specs for the same query share one analysis
+            self.assertEqual(report["analyze_time"][0], report["analyze_time"][1])
+
+    def test_render_batch_in_process(self):
+        # Figures are made outside pyplot, so none is opened with the active backend
+        with tempfile.TemporaryDirectory() as out_dir, \
+                mock.patch("matplotlib.pyplot.figure", side_effect=AssertionError("pyplot figure opened")):
+            report = self.chat.graph.render_batch([("line", "messages per day"), ("bar", "words per month by sender")],
+                                                  out_dir)
+            for path in report["path"]:
+                self.assertTrue(os.path.isfile(path))
+        self.assertEqual(plt.get_fignums(), [])
+
+    def test_render_batch_invalid_kind(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            with self.assertRaises(ValueError):
+                self.chat.graph.render_batch([("pie", "messages per day")], out_dir)
@@ -1,7 +1,13 @@
+import json
+import os
 import pickle
+import tempfile
 import unittest
 
+import pandas as pd
+
 import chatanalytics  # to be run in base directory
+from .utils_for_test_cases import write_synthetic_exports
 
 
 class DiscordChatTest(unittest.TestCase):
@@ -66,6 +72,22 @@ class DiscordChatTest(unittest.TestCase):
 
         self.assertEqual(chatA, chatB)
 
+    def test_hash(self):
+        chat = chatanalytics.Chat()
+        chat.load(self.raw_data_path + self.direct_message_path)
+        same = chatanalytics.Chat()
+        same.load(self.raw_data_path + self.direct_message_path)
+        self.assertIsInstance(chat.__hash__(), int)
+        self.assertEqual(hash(chat), hash(same))
+        self.assertEqual({chat: 1}[same], 1)
+
+    def test_load_keeps_timestamps(self):
+        chat = chatanalytics.Chat()
+        chat.load(self.raw_data_path + self.direct_message_path)
+        self.assertTrue(isinstance(chat.messages["timestamp"].dtype, pd.DatetimeTZDtype))
+        chat.set_timezone(self.timezone)
+        self.assertEqual(str(chat.messages["timestamp"].dt.tz), self.timezone)
+
 
 
 class MessengerChatTest(unittest.TestCase):
@@ -118,3 +140,82 @@ class MessengerChatTest(unittest.TestCase):
         chatB.load(self.raw_data_path + self.group_message_path + self.end)
 
         self.assertEqual(chatA, chatB)
+
+
+class MessengerThreadTest(unittest.TestCase):
+
+    @staticmethod
+    def _message(timestamp, content, sender="Amélie"):
+        # Messenger writes UTF-8 text as latin-1 escapes
+        return {"sender_name": sender.encode("utf-8").decode("latin-1"), "timestamp_ms": timestamp,
+                "content": content.encode("utf-8").decode("latin-1"), "type": "Generic", "is_unsent": False}
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.thread_path = os.path.join(self.directory.name, "inbox", "thread_1a2b3c")
+        os.makedirs(self.thread_path)
+        parts = [
+            [self._message(4000, "café ☕"), self._message(3000, "three")],
+            [self._message(2000, "two"), self._message(1000, "one")],
+        ]
+        for number, messages in enumerate(parts, start=1):
+            data = {"participants": [{"name": "Amélie"}], "messages": messages,
+                    "title": "Thread", "magic_words": []}
+            with open(os.path.join(self.thread_path, f"message_{number}.json"), "w", encoding="utf-8") as f:
+                json.dump(data, f)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_thread_import(self):
+        chat = chatanalytics.Chat()
+        chat.set_timezone("UTC")
+        chat.load(self.thread_path)
+        self.assertEqual(chat.messages.content.tolist(), ["one", "two", "three", "café ☕"])
+        self.assertEqual(chat.messages.sender.unique().tolist(), ["Amélie"])
+        self.assertTrue(chat.messages.timestamp.is_monotonic_increasing)
+
+    def test_thread_import_equals_part_import(self):
+        chatA = chatanalytics.Chat()
+        chatA.load(self.thread_path)
+
+        chatB = chatanalytics.Chat()
+        chatB.load(os.path.join(self.thread_path, "message_2.json"))
+        chatB.load(os.path.join(self.thread_path, "message_1.json"))
+
+        self.assertEqual(chatA, chatB)
+
+    def test_batch_import_loads_threads(self):
+        chat = chatanalytics.Chat()
+        chat.batch_load(self.directory.name, do_walk=True)
+        self.assertEqual(len(chat.messages.index), 4)
+        self.assertEqual(chat._loaded_files, [os.path.abspath(self.thread_path)])
+
+
+class PostProcessTest(unittest.TestCase):
+
+    def test_equals_stable_sort(self):
+        directory, _, _ = write_synthetic_exports(
+            self, messenger=dict(messages=3000, threads=5, messages_per_file=400),
+            discord=dict(messages=3000, channels=7))
+        chat = chatanalytics.Chat()
+        chat.batch_load(directory, do_walk=True)
+
+        expected = chat._messages.sort_values("timestamp", kind="stable", ignore_index=True)
+        self.assertTrue(chat.messages.drop(columns="conversation")
+                        .equals(expected.drop_duplicates(ignore_index=True).drop(columns="conversation")))
+
+    def test_nothing_loaded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            chat = chatanalytics.Chat().batch_load(directory, do_walk=True)
+            # Frames with no rows may have object timestamps
+            self.assertEqual(len(chat._sort_order(chat._messages.astype(object))), 0)
+            chat.messages  # noqa, processes
+
+    def test_reload_after_processing_drops_duplicates(self):
+        path = "test/test_data/discord/messages/c533895984269587"
+        chat = chatanalytics.Chat().load(path)
+        processed = chat.messages.copy()
+        # Processed messages have conversation numbers, which loaded copies do not yet
+        chat.load(path)
+        pd.testing.assert_frame_equal(chat.messages, processed)
@@ -0,0 +1,134 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import pandas as pd
+
+import chatanalytics  # to be run in base directory
+from chatanalytics.chatsql import ChatSQL
+from .utils_for_test_cases import write_synthetic_exports
+
+
+class ChatSQLTest(unittest.TestCase):
+    queries = [
+        "messages per day",
+        "words per month by sender",
+        "conversations per week",
+        "characters per sender and channel",
+        "duration per conversation",
+        "mean of characters per conversation by channel",
+        "median of messages per day by year",
+        "total of words per conversation by sender",
+        "stdev of messages per day",
+        "range of messages per week by channel",
+        "max of words per message by year",
+        "min of messages per week",
+        "mode of messages per day",
+        "mean of duration per conversation",
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory, _, _ = write_synthetic_exports(cls, messenger=dict(messages=3000, threads=5),
+                                                      discord=dict(messages=2000, channels=4))
+
+    def setUp(self):
+        self.chat = chatanalytics.Chat().set_timezone("Asia/Tokyo").batch_load(self.directory, do_walk=True)
+
+    def assertSameResult(self, expected, result):
+        if isinstance(expected, pd.Series):
+            pd.testing.assert_series_equal(expected, result, check_dtype=False, check_index_type=False)
+        elif isinstance(expected, pd.Timedelta):
+            # The pandas backend keeps the timestamps' resolution
+            self.assertLess(abs(expected - result), pd.Timedelta(microseconds=1))
+        else:
+            self.assertAlmostEqual(expected, result)
+
+    def test_matches_pandas(self):
+        sql = chatanalytics.Chat().set_timezone("Asia/Tokyo").batch_load(self.directory, do_walk=True)
+        sql.set_analyze_backend("sql")
+        for query in self.queries:
+            with self.subTest(query=query):
+                self.assertSameResult(self.chat.analyze(query), sql.analyze(query))
+
+    def test_restores_after_changes(self):
+        self.chat.set_analyze_backend("sql")
+        before = self.chat.analyze("messages per channel")
+        self.chat.set_timezone("UTC")
+        self.assertSameResult(chatanalytics.Chat().set_timezone("UTC")
+                              .batch_load(self.directory, do_walk=True).analyze("messages per day"),
+                              self.chat.analyze("messages per day"))
+
+        _, _, channels = write_synthetic_exports(self, discord=dict(messages=100, channels=1, seed=1))
+        self.chat.load(channels[0])
+        after = self.chat.analyze("messages per channel")
+        self.assertGreater(after.sum(), before.sum())
+        self.assertEqual(after.sum(), len(self.chat.messages.index))
+
+    def test_reopen_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "chat.db")
+            self.chat.set_analyze_backend("sql", path)
+            self.chat.analyze("messages per day")
+            self.chat.snapshot()._analyze_backend.close()
+
+            database = ChatSQL(None, path)
+            for query in self.queries:
+                with self.subTest(query=query):
+                    self.assertSameResult(self.chat.set_analyze_backend("pandas").analyze(query),
+                                          database.analyze(query))
+            database.close()
+
+    def test_indexes(self):
+        self.chat.set_analyze_backend("sql").analyze("messages per day")
+        analysis = self.chat.snapshot()._analyze_backend
+        indexes = {row[0] for row in analysis._connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (analysis._table,))}
+        self.assertTrue({f"{analysis._table}_{column}" for column in ["timestamp", "channel", "sender"]} <= indexes)
+
+    def test_snapshots_share_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.chat.set_analyze_backend("sql", os.path.join(directory, "chat.db"))
+            first = self.chat.snapshot()
+            _, _, channels = write_synthetic_exports(self, discord=dict(messages=200, channels=2, seed=1))
+            self.chat.load(channels[0])
+            second = self.chat.snapshot()
+            expected = {snapshot: len(snapshot.messages.index) for snapshot in [first, second]}
+            self.assertNotEqual(expected[first], expected[second])
+
+            with self.chat.profile() as profiler:
+                for _ in range(3):
+                    for snapshot in [first, second]:
+                        self.assertEqual(snapshot.analyze("messages per channel").sum(), expected[snapshot])
+            # Each version is stored once, however queries alternate between them
+            self.assertEqual((profiler.report()["stage"] == "store").sum(), 2)
+
+            errors, results = [], []
+
+            def read(snapshot):
+                try:
+                    for query in self.queries[:6]:
+                        snapshot.analyze(query)
+                        results.append((snapshot, int(snapshot.analyze("messages per channel").sum())))
+                except Exception as e:  # noqa, reported below
+                    errors.append(e)
+
+            self.chat.load(channels[1])  # a new version, stored while the others are read
+            third = self.chat.snapshot()
+            expected[third] = len(third.messages.index)
+            self.assertNotIn(expected[third], [expected[first], expected[second]])
+            readers = [threading.Thread(target=read, args=(snapshot,)) for snapshot in [first, second, third] * 2]
+            for reader in readers:
+                reader.start()
+            for reader in readers:
+                reader.join()
+
+            self.assertEqual(errors, [])
+            self.assertEqual(len(results), len(readers) * 6)
+            for snapshot, total in results:
+                self.assertEqual(total, expected[snapshot])
+            first._analyze_backend.close()
+
+    def test_invalid_backend(self):
+        self.assertRaises(ValueError, self.chat.set_analyze_backend, "spreadsheet")
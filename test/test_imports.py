@@ -0,0 +1,29 @@
+import subprocess
+import sys
+import unittest
+
+
+class ImportTest(unittest.TestCase):
+
+    def _loaded_modules(self, statement):
+        result = subprocess.run([sys.executable, "-c", statement + "; import sys; print(' '.join(sys.modules))"],
+                                capture_output=True, text=True, check=True)
+        return set(result.stdout.split())
+
+    def test_import_is_lazy(self):
+        modules = self._loaded_modules("import chatanalytics")
+        self.assertNotIn("pandas", modules)
+        self.assertNotIn("chatanalytics.chats", modules)
+
+    def test_chat_is_loaded_on_access(self):
+        modules = self._loaded_modules("import chatanalytics; chatanalytics.Chat()")
+        self.assertIn("chatanalytics.chats", modules)
+        self.assertNotIn("chatanalytics.chatgraph", modules)
+
+    def test_dictionary_is_loaded_on_use(self):
+        statement = ("from chatanalytics import autocorrect; print(autocorrect.query_index is None);"
+                     "autocorrect.correct_word('mesages'); print(len(autocorrect.query_index[0]))")
+        result = subprocess.run([sys.executable, "-c", statement], capture_output=True, text=True, check=True)
+        before, after = result.stdout.split()
+        self.assertEqual(before, "True")
+        self.assertNotEqual(after, "0")
@@ -0,0 +1,99 @@
+import os
+import shutil
+import threading
+import unittest
+
+import pandas as pd
+
+import chatanalytics  # to be run in base directory
+from .utils_for_test_cases import write_synthetic_exports
+
+
+class ManifestTest(unittest.TestCase):
+    queries = [
+        "messages per day",
+        "words per month by sender",
+        "messages per sender and channel",
+    ]
+
+    def setUp(self):
+        self.directory, self.messenger, self.discord = write_synthetic_exports(
+            self, messenger=dict(messages=2000, threads=4), discord=dict(messages=1500, channels=4))
+
+    def _chat(self):
+        chat = chatanalytics.Chat().set_timezone("Asia/Tokyo").set_rollup()
+        return chat.batch_load(self.directory, do_walk=True)
+
+    def _assert_same(self, refreshed, loaded):
+        columns = ["timestamp", "channel", "sender", "content"]
+        pd.testing.assert_frame_equal(
+            refreshed.messages.sort_values(columns, ignore_index=True).drop(columns="conversation"),
+            loaded.messages.sort_values(columns, ignore_index=True).drop(columns="conversation"))
+        self.assertEqual(len(refreshed.conversations.index), len(loaded.conversations.index))
+        for query in self.queries:
+            with self.subTest(query=query):
+                pd.testing.assert_series_equal(refreshed.analyze(query), loaded.analyze(query),
+                                               check_dtype=False, check_index_type=False)
+
+    def test_manifest(self):
+        chat = self._chat()
+        manifest = chat.manifest
+        self.assertEqual(set(manifest["source"]), {os.path.abspath(path) for path in self.messenger + self.discord})
+        self.assertIn(os.path.abspath(self.discord[0] + "/messages.csv"), set(manifest["path"]))
+        per_source = manifest.drop_duplicates("source")
+        self.assertEqual(per_source["rows"].sum(), len(chat.messages.index))
+        self.assertTrue((per_source["first_row"] <= per_source["last_row"]).all())
+
+    def test_unchanged(self):
+        chat = self._chat()
+        chat.messages  # noqa, process
+        snapshot = chat.snapshot()
+        # A file rewritten with the same contents is digested, not loaded
+        touched = self.discord[1] + "/messages.csv"
+        os.utime(touched, (0, 0))
+
+        changes = chat.refresh(self.directory, do_walk=True)
+        self.assertEqual(changes, {"added": [], "modified": [], "deleted": []})
+        self.assertIs(chat.snapshot(), snapshot)
+        self.assertEqual(chat.manifest.set_index("path").loc[os.path.abspath(touched), "mtime"],
+                         pd.Timestamp(0, tz="UTC"))
+
+    def test_refresh(self):
+        chat = self._chat()
+        chat.messages  # noqa, process
+
+        # Modify a Discord channel, delete a Messenger thread and add a Discord channel
+        modified = self.discord[0]
+        messages = pd.read_csv(modified + "/messages.csv")
+        messages.iloc[::2].to_csv(modified + "/messages.csv", index=False)
+        deleted = self.messenger[0]
+        shutil.rmtree(deleted)
+        added = modified + "_copy"
+        shutil.copytree(modified, added)
+        with open(added + "/channel.json", "w", encoding='utf-8') as file:
+            file.write('{"id": "copy", "name": "copy", "guild": {"name": "copy"}}')
+
+        changes = chat.refresh(self.directory, do_walk=True)
+        self.assertEqual(changes["modified"], [os.path.abspath(modified)])
+        self.assertEqual(changes["deleted"], [os.path.abspath(deleted)])
+        self.assertEqual(changes["added"], [os.path.abspath(added)])
+
+        self._assert_same(chat, self._chat())
+        self.assertEqual(chat.rollup["message"].sum(), len(chat.messages.index))
+        self.assertEqual(chat.refresh(self.directory, do_walk=True),
+                         {"added": [], "modified": [], "deleted": []})
+
+    def test_watch(self):
+        chat = self._chat()
+        shutil.rmtree(self.messenger[0])
+        stop = threading.Event()
+        stop.set()  # refresh once
+        seen = []
+        chat.watch(self.directory, do_walk=True, interval=0, stop=stop, callback=seen.append)
+        self.assertEqual(len(seen), 1)
+        self.assertEqual(seen[0]["deleted"], [os.path.abspath(self.messenger[0])])
+        self.assertEqual(chat.snapshot(latest=False).version, chat._version)
+
+
+if __name__ == '__main__':
+    unittest.main()
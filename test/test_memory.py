@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import chatanalytics  # to be run in base directory
+from .utils_for_test_cases import write_synthetic_exports
+
+
+class MemoryBudgetTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        directory, _, _ = write_synthetic_exports(cls, discord=dict(messages=3000, channels=6))
+        cls.path = os.path.join(directory, "discord", "messages")
+        cls.baseline = chatanalytics.Chat().batch_load(cls.path, do_walk=True)
+        cls.usage = cls.baseline.messages.memory_usage(deep=True).sum()
+
+    def assertSameMessages(self, chat):
+        self.assertEqual(chat, self.baseline)
+        pd.testing.assert_series_equal(chat.analyze("messages per channel"),
+                                       self.baseline.analyze("messages per channel"))
+
+    def test_memory_report(self):
+        report = self.baseline.memory_report()
+        self.assertEqual(list(report.columns), ["frame", "column", "bytes"])
+        messages = report[report["frame"] == "messages"]
+        self.assertIn("content", messages["column"].tolist())
+        self.assertEqual(messages["bytes"].sum(), self.usage)
+        self.assertIn("conversations", report["frame"].tolist())
+
+        self.baseline.normalized_content  # noqa, fill cache
+        self.assertIn("normalized_content", self.baseline.memory_report()["frame"].tolist())
+
+    def test_within_budget(self):
+        chat = chatanalytics.Chat().batch_load(self.path, do_walk=True, memory_budget=self.usage * 10)
+        self.assertEqual(chat, self.baseline)
+
+    def test_compacted(self):
+        chat = chatanalytics.Chat().batch_load(self.path, do_walk=True, memory_budget=int(self.usage * 0.8))
+        self.assertIsInstance(chat._messages["channel"].dtype, pd.CategoricalDtype)
+        self.assertSameMessages(chat)
+        self.assertEqual(chat.messages.dtypes.tolist(), self.baseline.messages.dtypes.tolist())
+
+    def test_spilled(self):
+        with tempfile.TemporaryDirectory() as spill_dir:
+            chat = chatanalytics.Chat().batch_load(self.path, do_walk=True, memory_budget=self.usage // 4,
+                                                   spill_dir=spill_dir)
+            self.assertTrue(os.listdir(spill_dir))
+            self.assertIn("spilled", chat.memory_report()["frame"].tolist())
+
+            self.assertSameMessages(chat)
+            self.assertEqual(os.listdir(spill_dir), [])
+
+    def test_over_budget(self):
+        chat = chatanalytics.Chat()
+        with self.assertRaises(MemoryError):
+            chat.batch_load(self.path, do_walk=True, memory_budget=self.usage // 4)
+
+    def test_file_over_budget_fails_before_reading(self):
+        chat = chatanalytics.Chat()
+        with self.assertRaises(MemoryError):
+            chat.batch_load(self.path, do_walk=True, memory_budget=10)
+        self.assertTrue(chat._messages.empty)
+
+    def test_channel_estimated_as_a_whole(self):
+        channel = os.path.join(self.path, sorted(f for f in os.listdir(self.path) if f.startswith("c"))[0])
+        budget = os.path.getsize(os.path.join(channel, "channel.json")) * 2
+        self.assertLess(budget, os.path.getsize(os.path.join(channel, "messages.csv")))
+        chat = chatanalytics.Chat()
+        with self.assertRaises(MemoryError):
+            chat.load(os.path.join(channel, "channel.json"), memory_budget=budget)
+        self.assertTrue(chat._messages.empty)
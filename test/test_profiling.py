@@ -0,0 +1,63 @@
+import pickle
+import unittest
+
+import chatanalytics  # to be run in base directory
+
+
+class ProfilingTest(unittest.TestCase):
+    raw_data_path = "test/test_data/discord/messages/"
+    direct_message_path = "c533895984269587"
+    group_message_path = "c5662031163313723"
+
+    def test_stages_recorded(self):
+        chat = chatanalytics.Chat()
+        with chat.profile() as profiler:
+            chat.load(self.raw_data_path + self.direct_message_path)
+            chat.load(self.raw_data_path + self.group_message_path)
+            chat.analyze("messages per day")
+
+        report = profiler.report()
+        stages = report["stage"].tolist()
+        for stage in ["read", "pre_process", "concat", "load", "sort", "drop_duplicates",
+                      "make_conversations", "post_process", "autocorrect", "parse_query",
+                      "group", "target", "analyze"]:
+            self.assertIn(stage, stages)
+        self.assertEqual(stages.count("load"), 2)
+        self.assertTrue((report["seconds"] >= 0).all())
+
+        post_process = report[report["stage"] == "post_process"].iloc[0]
+        self.assertEqual(post_process["rows"], len(chat.messages.index))
+        self.assertEqual(post_process["depth"], 0)  # processed for the snapshot analyze runs on
+        self.assertFalse(report["memory"].isna().all())
+
+    def test_scalar_query(self):
+        chat = chatanalytics.Chat()
+        chat.load(self.raw_data_path + self.direct_message_path)
+        with chat.profile() as profiler:
+            result = chat.analyze("mean of messages per day")
+        analyze = profiler.report().set_index("stage").loc["analyze"]
+        self.assertEqual(analyze["rows"], 1)
+        self.assertGreater(result, 0)
+
+    def test_sink(self):
+        chat = chatanalytics.Chat()
+        records = []
+        with chat.profile(sink=records.append, memory=False) as profiler:
+            chat.load(self.raw_data_path + self.direct_message_path)
+        self.assertEqual(records, profiler.records)
+        self.assertTrue(all(record["memory"] is None for record in records))
+
+    def test_disabled_after_block(self):
+        chat = chatanalytics.Chat()
+        with chat.profile() as profiler:
+            chat.load(self.raw_data_path + self.direct_message_path)
+        count = len(profiler.records)
+        chat.analyze("messages per day")
+        self.assertEqual(len(profiler.records), count)
+
+    def test_pickle_while_profiling(self):
+        chat = chatanalytics.Chat()
+        with chat.profile(sink=lambda record: None):
+            chat.load(self.raw_data_path + self.direct_message_path)
+            copy = pickle.loads(pickle.dumps(chat))
+        self.assertEqual(copy, chat)
@@ -0,0 +1,78 @@
+import unittest
+
+import pandas as pd
+
+import chatanalytics  # to be run in base directory
+from .utils_for_test_cases import write_synthetic_exports
+
+
+class RollupTest(unittest.TestCase):
+    queries = [
+        "messages per day",
+        "words per month by sender",
+        "characters per year by channel",
+        "messages per sender and channel",
+        "median of messages per day by year",
+        "mean of words per week by sender and channel",
+        "stdev of characters per day by channel",
+        "mode of messages per month",
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory, cls.messenger, cls.discord = write_synthetic_exports(
+            cls, messenger=dict(messages=3000, threads=4), discord=dict(messages=2000, channels=4))
+
+    def _chat(self, rollup):
+        return chatanalytics.Chat().set_timezone("Asia/Tokyo").set_rollup(rollup)
+
+    def test_matches_messages(self):
+        chat = self._chat(False).batch_load(self.directory, do_walk=True)
+        rollup = self._chat(True).batch_load(self.directory, do_walk=True)
+        self.assertIsNone(chat.rollup)
+        self.assertEqual(rollup.rollup["message"].sum(), len(rollup.messages.index))
+        for query in self.queries:
+            with self.subTest(query=query):
+                pd.testing.assert_series_equal(chat.analyze(query), rollup.analyze(query),
+                                               check_dtype=False, check_index_type=False)
+
+    def test_memory_report(self):
+        chat = self._chat(True).batch_load(self.directory, do_walk=True)
+        self.assertNotIn("rollup", chat.memory_report()["frame"].tolist())
+        usage = chat.rollup.memory_usage(deep=True)  # built on processing
+        rollup = chat.memory_report().query("frame == 'rollup'")
+        self.assertEqual(rollup["column"].tolist(), usage.index.tolist())
+        self.assertEqual(rollup["bytes"].sum(), usage.sum())
+
+    def test_incremental(self):
+        paths = self.messenger + self.discord
+        incremental = self._chat(True)
+        for path in paths:
+            incremental.load(path)
+            incremental.rollup  # noqa, process
+        # Loading again adds nothing, as duplicate messages are dropped
+        incremental.load(paths[0])
+
+        rebuilt = self._chat(True)
+        for path in paths:
+            rebuilt.load(path)
+        sort = ["day", "sender", "channel"]
+        pd.testing.assert_frame_equal(incremental.rollup.sort_values(sort, ignore_index=True),
+                                      rebuilt.rollup.sort_values(sort, ignore_index=True), check_dtype=False)
+
+    def test_falls_back_to_messages(self):
+        chat = self._chat(True).batch_load(self.directory, do_walk=True)
+        with chat.profile() as profiler:
+            chat.analyze("messages per day")
+            chat.analyze("median of words per message by sender")
+            chat.analyze("duration per day")
+        stages = profiler.report()["stage"].tolist()
+        self.assertEqual(stages.count("rollup_query"), 1)
+        self.assertEqual(stages.count("group"), 2)
+
+    def test_timezone_rebuilds(self):
+        chat = self._chat(True).batch_load(self.directory, do_walk=True)
+        chat.analyze("messages per day")
+        chat.set_timezone("America/New_York")
+        expected = self._chat(False).set_timezone("America/New_York").batch_load(self.directory, do_walk=True)
+        pd.testing.assert_series_equal(expected.analyze("messages per day"), chat.analyze("messages per day"))
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import threading
+import unittest
+
+import pandas as pd
+
+import chatanalytics  # to be run in base directory
+from chatanalytics import client, protocol
+from chatanalytics.server import ChatServer
+from .utils_for_test_cases import write_synthetic_exports
+
+
+class ServerTest(unittest.TestCase):
+    queries = [
+        "messages per day",
+        "words per month by sender",
+        "mean of characters per conversation by channel",
+        "duration per conversation",
+        "median of response time per message by sender",
+        "mode of messages per day",
+        "max of words per message",
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory, _, _ = write_synthetic_exports(cls, messenger=dict(messages=2000, threads=3),
+                                                      discord=dict(messages=1000, channels=3))
+        cls.chats = {}
+        for name in ["messenger", "discord"]:
+            cls.chats[name] = chatanalytics.Chat().set_timezone("Asia/Tokyo")
+            cls.chats[name].batch_load(os.path.join(cls.directory, name), do_walk=True)
+
+        cls.server = ChatServer(cls.chats)
+        cls.loop = asyncio.new_event_loop()
+        cls.socket_path = os.path.join(cls.directory, "server.sock")
+        cls.port = cls.loop.run_until_complete(cls.server.start())[1]
+        cls.unix_server = ChatServer(cls.chats)
+        cls.loop.run_until_complete(cls.unix_server.start(path=cls.socket_path))
+        cls.thread = threading.Thread(target=cls.loop.run_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        def stop():
+            cls.server.close()
+            cls.unix_server.close()
+            cls.loop.stop()
+        cls.loop.call_soon_threadsafe(stop)
+        cls.thread.join()
+
+    def assertSameResult(self, expected, result):
+        if isinstance(expected, pd.Series):
+            pd.testing.assert_series_equal(expected, result)
+        else:
+            self.assertEqual(expected, result)
+
+    def test_analyze(self):
+        for name, chat in self.chats.items():
+            remote = client.connect(name, port=self.port)
+            for query in self.queries:
+                with self.subTest(chat=name, query=query):
+                    self.assertSameResult(chat.analyze(query), remote.analyze(query))
+            remote.client.close()
+
+    def test_unix_socket(self):
+        with client.ChatClient(path=self.socket_path) as connection:
+            self.assertSameResult(self.chats["discord"].analyze("messages per channel"),
+                                  connection.analyze("messages per channel", chat="discord"))
+            self.assertEqual(set(connection.chats()), {"messenger", "discord"})
+
+    def test_cache(self):
+        with client.ChatClient(self.port) as connection:
+            connection.analyze("characters per year", chat="messenger")
+            hits = connection.request("ping")["hits"]
+            connection.analyze("characters per year", chat="messenger")
+            self.assertEqual(connection.request("ping")["hits"], hits + 1)
+
+    def test_graph_data(self):
+        with client.ChatClient(self.port) as connection:
+            result, parsed = connection.graph_data("messages per day", chat="messenger", max_points=50)
+        self.assertEqual(parsed["title"], "Messages Per Day")
+        self.assertLessEqual(len(result.index), 50)
+
+    def test_errors(self):
+        with client.ChatClient(self.port) as connection:
+            self.assertRaises(ValueError, connection.analyze, "messages of everything", chat="messenger")
+            self.assertRaises(KeyError, connection.analyze, "messages per day", chat="telegram")
+            # The connection is still usable after errors
+            self.assertEqual(len(connection.chats()), 2)
+
+    def test_concurrent_clients(self):
+        expected = self.chats["messenger"].analyze("words per week by sender")
+        results = []
+
+        def query():
+            with client.ChatClient(self.port) as connection:
+                results.append(connection.analyze("words per week by sender", chat="messenger"))
+        threads = [threading.Thread(target=query) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 4)
+        for result in results:
+            pd.testing.assert_series_equal(expected, result)
+
+    def test_encoding(self):
+        series = pd.Series([pd.Timedelta(seconds=1), pd.NaT], index=pd.MultiIndex.from_tuples(
+            [("a", pd.Timestamp("2020-01-01").date()), ("b", pd.Timestamp("2020-01-02").date())],
+            names=["sender", "day"]))
+        pd.testing.assert_series_equal(protocol.decode_result(protocol.encode_result(series)), series)
+        self.assertEqual(protocol.decode_result(protocol.encode_result(pd.Timedelta(days=2))), pd.Timedelta(days=2))
@@ -0,0 +1,80 @@
+import threading
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import chatanalytics  # to be run in base directory
+from .utils_for_test_cases import write_synthetic_exports
+
+
+class SnapshotTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        _, _, cls.paths = write_synthetic_exports(cls, discord=dict(messages=4000, channels=8))
+
+    def test_versions(self):
+        chat = chatanalytics.Chat().load(self.paths[0])
+        first = chat.snapshot()
+        self.assertIs(chat.snapshot(), first)
+
+        chat.load(self.paths[1])
+        self.assertIs(chat.snapshot(latest=False), first)
+        second = chat.snapshot()
+        self.assertGreater(second.version, first.version)
+        self.assertGreater(len(second.messages.index), len(first.messages.index))
+
+    def test_shares_columns(self):
+        chat = chatanalytics.Chat().load(self.paths[0])
+        snapshot = chat.snapshot()
+        self.assertTrue(np.shares_memory(chat.messages["conversation"].to_numpy(),
+                                         snapshot.messages["conversation"].to_numpy()))
+
+    def test_unchanged_by_writes(self):
+        chat = chatanalytics.Chat().set_timezone("UTC").load(self.paths[0])
+        snapshot = chat.snapshot()
+        messages = snapshot.messages.copy()
+        expected = snapshot.analyze("messages per day")
+
+        chat.set_timezone("Asia/Tokyo")
+        chat.load(self.paths[1])
+        chat.messages  # noqa, process
+        chat.clear()
+
+        pd.testing.assert_frame_equal(snapshot.messages, messages)
+        pd.testing.assert_series_equal(snapshot.analyze("messages per day"), expected)
+
+    def test_set_timezone_before_processing(self):
+        chat = chatanalytics.Chat().set_timezone("UTC").load(self.paths[0])
+        chat.set_timezone("Asia/Tokyo")
+        self.assertEqual(str(chat.messages["timestamp"].dt.tz), "Asia/Tokyo")
+        self.assertEqual(str(chat.conversations["start_timestamp"].dt.tz), "Asia/Tokyo")
+
+    def test_concurrent_readers(self):
+        chat = chatanalytics.Chat().set_timezone("UTC").load(self.paths[0])
+        chat.snapshot()
+        errors, results = [], []
+
+        def read():
+            try:
+                for _ in range(5):
+                    snapshot = chat.snapshot(latest=False)
+                    result = snapshot.analyze("messages per channel")
+                    results.append((snapshot.version, int(result.sum()), len(snapshot.messages.index)))
+            except Exception as e:  # noqa, reported below
+                errors.append(e)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for path in self.paths[1:]:
+            chat.load(path)
+            chat.snapshot()
+        for reader in readers:
+            reader.join()
+
+        self.assertEqual(errors, [])
+        for version, total, rows in results:
+            self.assertEqual(total, rows)
+        self.assertEqual(chat.analyze("messages per channel").sum(), len(chat.messages.index))
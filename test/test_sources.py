@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import chatanalytics  # to be run in base directory
+from chatanalytics import sources
+
+
+class ZipSourceTest(unittest.TestCase):
+    discord_path = "test/test_data/discord/messages"
+    messenger_path = "test/test_data/messenger/messages"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.discord_zip = shutil.make_archive(os.path.join(cls.directory.name, "discord"), "zip",
+                                              os.path.dirname(cls.discord_path), "messages")
+        cls.messenger_zip = shutil.make_archive(os.path.join(cls.directory.name, "facebook"), "zip",
+                                                cls.messenger_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_archive_is_directory(self):
+        self.assertTrue(sources.isdir(self.discord_zip))
+        self.assertFalse(sources.isfile(self.discord_zip))
+        self.assertTrue(sources.isdir(self.discord_zip + "/messages/c533895984269587"))
+        self.assertTrue(sources.isfile(self.discord_zip + "/messages/c533895984269587/channel.json"))
+        self.assertEqual(sorted(sources.listdir(self.discord_zip + "/messages/c533895984269587")),
+                         ["channel.json", "messages.csv"])
+
+    def test_walk(self):
+        root = self.discord_zip + "/messages"
+        walked = {os.path.relpath(dirpath, root): sorted(filenames)
+                  for dirpath, _, filenames in sources.walk(root)}
+        expected = {os.path.relpath(dirpath, self.discord_path): sorted(filenames)
+                    for dirpath, _, filenames in os.walk(self.discord_path)}
+        self.assertEqual(walked, expected)
+        self.assertEqual(next(sources.walk(self.discord_zip))[:2], (self.discord_zip, ["messages"]))
+
+    def test_digest(self):
+        member = "/c533895984269587/messages.csv"
+        self.assertEqual(sources.digest(self.discord_zip + "/messages" + member),
+                         sources.digest(self.discord_path + member))
+        self.assertGreater(sources.getmtime(self.discord_zip + "/messages" + member), 0)
+
+    def test_discord_load(self):
+        chat = chatanalytics.Chat().load(self.discord_zip + "/messages/c5662031163313723")
+        expected = chatanalytics.Chat().load(self.discord_path + "/c5662031163313723")
+        self.assertEqual(chat, expected)
+
+    def test_messenger_load(self):
+        member = "/inbox/groupmessage_99hdkg23/message_1.json"
+        chat = chatanalytics.Chat().load(self.messenger_zip + member)
+        expected = chatanalytics.Chat().load(self.messenger_path + member)
+        self.assertEqual(chat, expected)
+
+    def test_batch_load(self):
+        for archive, path in [(self.discord_zip, self.discord_path), (self.messenger_zip, self.messenger_path)]:
+            chat = chatanalytics.Chat().batch_load(archive, do_walk=True)
+            expected = chatanalytics.Chat().batch_load(path, do_walk=True)
+            self.assertFalse(chat.messages.empty)
+            self.assertEqual(chat, expected)
+
+    def test_batch_load_with_memory_budget(self):
+        chat = chatanalytics.Chat().batch_load(self.discord_zip, do_walk=True, memory_budget=10**9)
+        expected = chatanalytics.Chat().batch_load(self.discord_path, do_walk=True)
+        self.assertEqual(chat, expected)
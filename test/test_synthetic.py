@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+import chatanalytics  # to be run in base directory
+from benchmarks import synthetic
+
+
+class SyntheticExportTest(unittest.TestCase):
+
+    def test_messenger_export(self):
+        with tempfile.TemporaryDirectory() as directory:
+            threads = synthetic.generate_messenger(directory, 2500, threads=3, noise=0,
+                                                   messages_per_file=1000)
+            self.assertEqual(len(threads), 3)
+            self.assertIn("message_1.json", os.listdir(threads[0]))
+            self.assertIn("message_2.json", os.listdir(threads[0]))
+
+            chat = chatanalytics.Chat()
+            chat.batch_load(os.path.join(directory, "inbox"), do_walk=True)
+            self.assertEqual(len(chat.messages), 2500)
+            self.assertTrue(chat.messages.timestamp.is_monotonic_increasing)
+
+    def test_discord_export(self):
+        with tempfile.TemporaryDirectory() as directory:
+            channels = synthetic.generate_discord(directory, 2500, channels=3, noise=0)
+            self.assertEqual(len(channels), 3)
+
+            chat = chatanalytics.Chat()
+            chat.batch_load(os.path.join(directory, "messages"), do_walk=True)
+            self.assertEqual(len(chat.messages), 2500)
+            self.assertEqual(chat.messages.channel.nunique(), 3)
+
+    def test_seed_is_deterministic(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            synthetic.generate_discord(a, 500, channels=2, seed=3)
+            synthetic.generate_discord(b, 500, channels=2, seed=3)
+            chat_a = chatanalytics.Chat().batch_load(os.path.join(a, "messages"), do_walk=True)
+            chat_b = chatanalytics.Chat().batch_load(os.path.join(b, "messages"), do_walk=True)
+            self.assertEqual(chat_a, chat_b)
@@ -0,0 +1,40 @@
+import unittest
+
+import pandas as pd
+
+from chatanalytics import utils
+
+
+class UtilsTest(unittest.TestCase):
+
+    def test_find_replies_interleaved_channels(self):
+        # Two channels active at the same time, alternating message by message
+        messages = pd.DataFrame({
+            "timestamp": pd.date_range("2022-01-01", periods=6, freq="min", tz="UTC"),
+            "channel": ["A", "B"] * 3,
+            "sender": ["a", "x", "b", "y", "a", "x"],
+        }, index=range(10, 16))
+        replies = utils.find_replies(messages)
+        self.assertEqual(replies.index.tolist(), list(range(10, 16)))
+        self.assertEqual(replies["turn"].tolist(), [False, False, True, True, True, True])
+        self.assertEqual(replies["response"].tolist(), [pd.NaT] * 2 + [pd.Timedelta(minutes=2)] * 4)
+
+    def test_find_replies_gap(self):
+        messages = pd.DataFrame({
+            "timestamp": pd.to_datetime(["2022-01-01 12:00", "2022-01-01 12:30", "2022-01-01 14:00"], utc=True),
+            "channel": ["A"] * 3,
+            "sender": ["a", "b", "a"],
+        })
+        replies = utils.find_replies(messages)
+        self.assertEqual(replies["turn"].tolist(), [False, True, False])
+
+    def test_decode_latin1_escapes(self):
+        strings = pd.Series(["plain", "cafÃ©", "â\u0098\u0095"], index=[3, 4, 5])
+        decoded = utils.decode_latin1_escapes(strings)
+        self.assertEqual(decoded.tolist(), ["plain", "café", "☕"])
+        self.assertEqual(decoded.index.tolist(), [3, 4, 5])
+
+    def test_decode_latin1_escapes_fallback(self):
+        # Already-decoded text cannot be re-encoded as latin-1 and is kept
+        strings = pd.Series(["cafÃ©", "☕"])
+        self.assertEqual(utils.decode_latin1_escapes(strings).tolist(), ["café", "☕"])
@@ -1,3 +1,7 @@
+import csv
+import json
+import os
+import tempfile
 from random import randint
 
 
@@ -14,3 +18,48 @@ def gen_messenger_id(length):
     for i in range(length):
         s += chars[randint(0, len(chars))]
     return s
+
+
+def write_discord_channel(directory, channel_id, timestamps, contents, channel_type=0):
+    """Writes a Discord channel folder (channel.json and messages.csv)
+
+    :param directory: folder to create the channel folder in
+    :param channel_id: numerical ID of the channel
+    :param timestamps: message timestamps as strings
+    :param contents: message contents
+    :param channel_type: Discord channel type
+    :return: path of the channel folder
+    """
+    path = os.path.join(directory, f"c{channel_id}")
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "channel.json"), "w", encoding='utf-8') as f:
+        json.dump({"id": str(channel_id), "type": channel_type}, f)
+    with open(os.path.join(path, "messages.csv"), "w", encoding='utf-8', newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ID", "Timestamp", "Contents", "Attachments"])
+        for timestamp, content in zip(timestamps, contents):
+            writer.writerow([gen_numerical_id(16), timestamp, content, ""])
+    return path
+
+
+def write_synthetic_exports(test_case, messenger=None, discord=None):
+    """Writes synthetic exports (see benchmarks/synthetic.py) to a temporary directory
+
+    The directory is removed after the test, or after the class's tests
+    if called from setUpClass.
+
+    :param test_case: the TestCase, or its class in setUpClass
+    :param messenger: keyword arguments of generate_messenger, or None for no Messenger export
+    :param discord: keyword arguments of generate_discord, or None for no Discord export
+    :return: (directory, Messenger thread folders, Discord channel folders); the exports are
+        in its messenger and discord subdirectories
+    """
+    from benchmarks import synthetic
+
+    enter_context = test_case.enterClassContext if isinstance(test_case, type) else test_case.enterContext
+    directory = enter_context(tempfile.TemporaryDirectory())
+    threads = synthetic.generate_messenger(os.path.join(directory, "messenger"), **messenger) \
+        if messenger is not None else []
+    channels = synthetic.generate_discord(os.path.join(directory, "discord"), **discord) \
+        if discord is not None else []
+    return directory, threads, channels